@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+clean_text 一致性检查和性能测试
+Author: GCH空城
+Date: 2025-07-08
+Description: 用抓下来的页面对比改写前后的clean_text，输出必须一模一样，再比一下各自要跑多久
+
+用法:
+    python benchmarks/clean_text_bench.py
+    python benchmarks/clean_text_bench.py --archive data/replay_archive.sqlite3
+
+页面来源:
+    - 默认读 benchmarks/pages/ 下的 .html，是照着网易财经、新浪财经、人民网的页面结构
+      整理的样例，标题、正文、时间戳、分隔符、评论区、script/style都有
+    - --archive 读录制/回放档案（config.py里REPLAY_MODE = 'record'跑一遍就有），
+      里面所有HTML响应都算进去，用真实抓到的页面测
+"""
+
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import sys
+import timeit
+import zlib
+
+from bs4 import BeautifulSoup
+
+# 添加项目路径到系统路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.utils import clean_text
+
+PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+
+
+def clean_text_old(text):
+    """改写前的clean_text，原样保留，用来对比"""
+    if not text:
+        return ""
+
+    # 移除HTML标签
+    text = re.sub(r'<[^>]+>', '', text)
+
+    # 移除JavaScript代码
+    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
+
+    # 移除CSS样式
+    text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
+
+    # 移除多余的空白字符
+    text = re.sub(r'\s+', ' ', text)
+
+    # 移除数字时间戳（如：20250707 151012）
+    text = re.sub(r'\b\d{8}\s+\d{6}\b', '', text)
+
+    # 移除单独的数字和时间
+    text = re.sub(r'\b\d{4}\b', '', text)  # 年份
+    text = re.sub(r'\b\d{1,2}:\d{2}\b', '', text)  # 时间
+
+    # 移除首尾空白
+    text = text.strip()
+
+    # 清理特殊字符但保留中文标点
+    text = re.sub(r'[^\w\s\u4e00-\u9fff，。、；：""''！？（）【】《》-]', '', text)
+
+    # 移除多余的分隔符
+    text = re.sub(r'[-|]{2,}', '', text)
+
+    return text
+
+
+def load_pages(pages_dir, archive=None):
+    """
+    读页面
+
+    Returns:
+        list: (页面名称, HTML文本)
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+
+    if archive:
+        conn = sqlite3.connect(archive)
+        rows = conn.execute('SELECT url, headers, body FROM exchanges WHERE status = 200').fetchall()
+        conn.close()
+        for url, headers, body in rows:
+            if 'html' not in headers.lower():
+                continue
+            soup = BeautifulSoup(zlib.decompress(body), 'html.parser')
+            pages.append((url, str(soup)))
+    return pages
+
+
+def build_corpus(pages):
+    """
+    把页面拆成clean_text会碰到的各种输入
+
+    爬虫传进来的是元素的文本（strip过的和没strip的都有），这里再加上元素的HTML源码和单个文本节点，
+    去标签、去script/style那几步也能测到
+    """
+    corpus = []
+    for _, html in pages:
+        soup = BeautifulSoup(html, 'html.parser')
+        for element in soup.find_all(True):
+            corpus.append(element.get_text())
+            corpus.append(element.get_text(strip=True))
+            corpus.append(str(element))
+        corpus.extend(str(text) for text in soup.find_all(string=True))
+    return corpus
+
+
+def compare(corpus):
+    """逐条对比，返回不一样的 [(输入, 旧输出, 新输出)]"""
+    diffs = []
+    for text in corpus:
+        old, new = clean_text_old(text), clean_text(text)
+        if old != new:
+            diffs.append((text, old, new))
+    return diffs
+
+
+def bench(func, corpus, repeat):
+    """跑repeat轮，取最快的一轮（秒）"""
+    return min(timeit.repeat(lambda: [func(text) for text in corpus], number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比改写前后的clean_text')
+    parser.add_argument('--pages', default=PAGES_DIR, help='HTML页面目录')
+    parser.add_argument('--archive', help='录制/回放档案，里面的HTML响应也算进去')
+    parser.add_argument('--repeat', type=int, default=20, help='性能测试跑几轮')
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages, args.archive)
+    if not pages:
+        print("没有找到页面")
+        return 1
+    corpus = build_corpus(pages)
+    # 已经清理过的文本，大部分标题都是这种，测一下快速路径
+    cleaned = [clean_text_old(text) for text in corpus]
+    print(f"页面 {len(pages)} 个，输入 {len(corpus)} 条（{sum(map(len, corpus)):,} 字符）")
+
+    diffs = compare(corpus) + compare(cleaned)
+    if diffs:
+        print(f"[FAIL] {len(diffs)} 条输出不一致，前5条:")
+        for text, old, new in diffs[:5]:
+            print(f"  输入: {text[:80]!r}\n  旧:   {old[:80]!r}\n  新:   {new[:80]!r}")
+        return 1
+    print(f"[OK] {len(corpus) + len(cleaned)} 条输出完全一致")
+
+    for name, texts in (('页面文本', corpus), ('已清理文本', cleaned)):
+        old_time = bench(clean_text_old, texts, args.repeat)
+        new_time = bench(clean_text, texts, args.repeat)
+        print(f"{name}: 旧 {old_time * 1000:.1f}ms, 新 {new_time * 1000:.1f}ms, 快 {old_time / new_time:.1f} 倍")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文章库
+Author: GCH空城
+Date: 2025-07-08
+Description: 所有爬到的文章存进DATA_DIR下的一个SQLite库，按规范化URL去重更新，标题和摘要建了全文索引，历史文章按关键词毫秒级查询
+"""
+
+import os
+import sqlite3
+import threading
+
+from .config import DATA_DIR, ARTICLE_DB_FILE
+from .utils import ensure_dir_exists, canonicalize_url
+
+# 全文索引的分词器，trigram能搜中文的任意片段（SQLite 3.34+），老版本退回unicode61（只能按空格分的词搜）
+FTS_TOKENIZERS = ['trigram', 'unicode61']
+
+# trigram至少要3个字才能用索引查，更短的关键词只能LIKE扫表
+TRIGRAM_MIN_LENGTH = 3
+
+ARTICLE_COLUMNS = ['url', 'title', 'summary', 'source', 'crawl_time', 'first_crawl_time']
+
+
+class ArticleStore:
+    """
+    文章库
+
+    - articles表：URL规范化后唯一，同一篇文章再爬到就更新（upsert），保留第一次爬到的时间
+    - source、crawl_time有索引，按网站、时间查不用扫表
+    - articles_fts是标题和摘要的FTS5全文索引，用触发器和articles表保持同步
+    """
+
+    def __init__(self, path=None):
+        """
+        打开（或创建）文章库
+
+        Args:
+            path: SQLite文件路径，默认放在DATA_DIR下
+        """
+        if path is None:
+            ensure_dir_exists(DATA_DIR)
+            path = os.path.join(DATA_DIR, ARTICLE_DB_FILE)
+        self.path = path
+        self._lock = threading.Lock()
+        # 多个线程共用一个连接，靠自己的锁保证安全
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                title TEXT,
+                summary TEXT,
+                source TEXT,
+                crawl_time TEXT,
+                first_crawl_time TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_source ON articles (source, crawl_time);
+            CREATE INDEX IF NOT EXISTS idx_articles_crawl_time ON articles (crawl_time);
+        ''')
+        self.tokenizer = self._create_fts()
+        self._conn.commit()
+
+    def _create_fts(self):
+        """
+        建全文索引，已经建过的话沿用原来的分词器
+
+        Returns:
+            str或None: 用的分词器，SQLite没编译FTS5时为None（只能LIKE查）
+        """
+        row = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'articles_fts'"
+        ).fetchone()
+        if row is not None:
+            sql = row[0].lower()
+            return next((name for name in FTS_TOKENIZERS if name in sql), 'unicode61')
+
+        for tokenizer in FTS_TOKENIZERS:
+            try:
+                self._conn.execute(f'''
+                    CREATE VIRTUAL TABLE articles_fts USING fts5(
+                        title, summary, content='articles', content_rowid='id', tokenize='{tokenizer}'
+                    )
+                ''')
+                break
+            except sqlite3.OperationalError:
+                continue
+        else:
+            return None
+
+        self._conn.executescript('''
+            CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, summary)
+                VALUES ('delete', old.id, old.title, old.summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, summary ON articles BEGIN
+                INSERT INTO articles_fts (articles_fts, rowid, title, summary)
+                VALUES ('delete', old.id, old.title, old.summary);
+                INSERT INTO articles_fts (rowid, title, summary) VALUES (new.id, new.title, new.summary);
+            END;
+            -- 表里原来就有文章的话补建索引
+            INSERT INTO articles_fts (articles_fts) VALUES ('rebuild');
+        ''')
+        return tokenizer
+
+    def upsert_many(self, news_data):
+        """
+        批量写入文章，URL已经有的就更新标题、摘要和爬取时间
+
+        Args:
+            news_data: 新闻列表
+
+        Returns:
+            int: 写入了多少篇
+        """
+        rows = []
+        for news in news_data:
+            url = canonicalize_url(news.get('url', '')) or news.get('url')
+            if not url:
+                continue
+            crawl_time = news.get('crawl_time')
+            rows.append((url, news.get('title'), news.get('summary'), news.get('source'), crawl_time, crawl_time))
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany('''
+                INSERT INTO articles (url, title, summary, source, crawl_time, first_crawl_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    title = excluded.title,
+                    summary = excluded.summary,
+                    source = excluded.source,
+                    crawl_time = excluded.crawl_time
+            ''', rows)
+            self._conn.commit()
+        return len(rows)
+
+    def search(self, keyword, source=None, limit=20):
+        """
+        按关键词搜标题和摘要
+
+        Args:
+            keyword: 关键词，多个词用空格分开，要同时出现
+            source: 只搜这个网站的
+            limit: 最多返回多少篇
+
+        Returns:
+            list: 文章dict，用全文索引时按相关度排，否则按爬取时间倒序
+        """
+        terms = keyword.split()
+        if not terms:
+            return []
+
+        # 能用全文索引的词用MATCH，太短的词（trigram要3个字以上）在索引命中的结果里再用LIKE过滤
+        fts_terms = [term for term in terms if self._can_use_fts(term)]
+        like_terms = [term for term in terms if term not in fts_terms]
+        columns = ', '.join('a.' + column for column in ARTICLE_COLUMNS)
+
+        conditions = []
+        params = []
+        if fts_terms:
+            sql = f'SELECT {columns} FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid'
+            # 每个词当成一个短语，用户输入里的引号、星号之类不会被当成FTS语法
+            conditions.append('articles_fts MATCH ?')
+            params.append(' '.join('"' + term.replace('"', '""') + '"' for term in fts_terms))
+            order = 'ORDER BY articles_fts.rank'
+        else:
+            sql = f'SELECT {columns} FROM articles a'
+            order = 'ORDER BY a.crawl_time DESC'
+
+        for term in like_terms:
+            conditions.append("(a.title LIKE ? ESCAPE '\\' OR a.summary LIKE ? ESCAPE '\\')")
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            params.extend([pattern, pattern])
+        if source is not None:
+            conditions.append('a.source = ?')
+            params.append(source)
+
+        sql += ' WHERE ' + ' AND '.join(conditions) + f' {order} LIMIT ?'
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def _can_use_fts(self, term):
+        """没有全文索引，或者词太短trigram查不了，就只能LIKE"""
+        if self.tokenizer is None:
+            return False
+        return self.tokenizer != 'trigram' or len(term) >= TRIGRAM_MIN_LENGTH
+
+    def get(self, url):
+        """按URL取一篇文章，没有返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(ARTICLE_COLUMNS)} FROM articles WHERE url = ?",
+                (canonicalize_url(url) or url,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def count(self, source=None):
+        """存了多少篇，传source只算这个网站的"""
+        with self._lock:
+            if source is None:
+                return self._conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM articles WHERE source = ?', (source,)
+            ).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
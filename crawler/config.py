@@ -2,18 +2,81 @@
 # 基础网络配置
 REQUEST_TIMEOUT = 10  # 请求超时时间，太短容易失败
 MAX_RETRIES = 3  # 重试次数，多了容易被ban
+RETRY_BACKOFF_BASE = 0.5  # 重试退避基数，第n次重试最多等 0.5 * 2^n 秒
+RETRY_BACKOFF_MAX = 30  # 单次退避最多等这么久
+RETRY_AFTER_MAX = 60  # 网站用Retry-After让等更久的话就不重试了
 CONNECTION_TEST_TIMEOUT = 5  # 连接测试超时
+SITE_DETECT_DEADLINE = 12  # 所有网站一起检测，最多等这么久，没测完的算失败
+HOMEPAGE_REUSE_SECONDS = 300  # 检测时下载的首页，这么多秒内爬取时直接用，不再请求
+
+# 连接池配置，所有组件共用一个Session，同一个网站的连接一直复用
+HTTP_POOL_CONNECTIONS = 32  # 最多给多少个网站留连接池
+HTTP_POOL_MAXSIZE = 16  # 每个网站最多留多少个keep-alive连接，不能小于单个网站的并发数
 
 # 爬虫行为配置  
 MAX_NEWS_COUNT = 20  # 一次最多爬多少条新闻
-DELAY_RANGE = (1, 3)  # 请求间隔，模拟人类行为
+DELAY_RANGE = (1, 3)  # 请求间隔，模拟人类行为（关闭自适应限速时才用）
 SUMMARY_MAX_LENGTH = 200  # 摘要长度限制
 MIN_TITLE_LENGTH = 10  # 标题太短的过滤掉
 MIN_SUMMARY_LENGTH = 20  # 摘要太短的也不要
 
+# 待爬队列配置
+MAX_CRAWL_DEPTH = 1  # 1只爬首页上的链接，2会接着爬文章页、栏目页上的链接，以此类推
+MAX_LINKS_PER_PAGE = 200  # 每个页面最多取多少个新闻链接
+FRONTIER_MAX_URLS = 5000  # 一次爬取最多收多少个URL，防止队列无限长
+
+# 并发抓取配置（asyncio引擎）
+ASYNC_CRAWL_ENABLED = True  # main里用并发引擎爬文章，关掉就回到逐条爬取
+ASYNC_CONCURRENCY = 8  # 同时在途的请求数上限
+ASYNC_PER_HOST_CONCURRENCY = 4  # 同一个网站同时在途的请求数，别把人家打挂了
+MULTI_SITE_MAX_WORKERS = 5  # 多网站模式下最多同时爬几个网站
+
+# 自适应限速配置，根据响应快慢和报错情况自动调整请求间隔
+AUTOTHROTTLE_ENABLED = True  # 关掉就回到固定的DELAY_RANGE
+AUTOTHROTTLE_START_DELAY = 2.0  # 刚开始不知道网站脾气，先慢点
+AUTOTHROTTLE_MIN_DELAY = 0.2  # 再快也不能低于这个间隔
+AUTOTHROTTLE_MAX_DELAY = 30.0  # 被限流时最多退让到这个间隔
+AUTOTHROTTLE_TARGET_CONCURRENCY = 2.0  # 期望每个网站同时在途的请求数
+
+# HTML解析配置
+HTML_PARSER = "lxml-tree"  # 可选 'lxml-tree'（最快）、'lxml'、'html.parser'（标准库）、'html5lib'（最宽容）
+
+# 流式提取配置，文章页边下载边解析，标题和摘要确定了就不再读剩下的部分
+STREAMING_EXTRACTION = False  # 需要lxml；文章页只读了一部分，不会进HTTP缓存
+STREAMING_CHUNK_SIZE = 16 * 1024  # 每次从连接读多少字节
+
 # 数据保存配置
 DATA_DIR = "data"
-SAVE_FORMATS = ['json', 'csv', 'excel']
+SAVE_FORMATS = ['json', 'csv', 'excel', 'sqlite']  # 还可以加'parquet'（需要pyarrow）；sqlite是一直累积的文章库，不按时间戳分文件
+ARTICLE_DB_FILE = "articles.sqlite3"  # 文章库，放在DATA_DIR下，可以按关键词全文搜索
+PARQUET_DATASET_DIR = "news_dataset"  # Parquet数据集放在DATA_DIR下这个目录，按网站和日期分区，每次保存往里追加
+PARQUET_COMPRESSION = "zstd"  # 可选 'zstd'、'snappy'、'gzip'、'none'
+JSONL_FSYNC_EVERY = 20  # 边爬边写的JSONL，每写这么多条刷一次盘
+JSONL_FSYNC_INTERVAL = 5.0  # 或者离上次刷盘超过这么多秒也刷一次
+LOAD_CHUNK_SIZE = 1024 * 1024  # 流式读历史JSON文件时每次读多少字符，内存占用和文件大小无关
+
+# HTTP缓存配置，重复爬的时候大部分请求只需要一个304
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_FILE = "http_cache.sqlite3"  # 放在DATA_DIR下
+HTTP_CACHE_TTL = 24 * 3600  # 文章发出来基本不改，一天内直接用缓存
+HTTP_CACHE_MAX_SIZE = 200 * 1024 * 1024  # 缓存总大小上限，超了按LRU淘汰
+
+# 已爬URL索引，定时重跑时跳过以前爬过的文章，所有网站共用一个
+SEEN_URLS_ENABLED = True
+SEEN_URLS_FILE = "seen_urls.sqlite3"  # 放在DATA_DIR下
+
+# 网站健康记录，启动时直接用上次的检测结果，不用每次都把所有网站检测一遍
+SITE_HEALTH_ENABLED = True
+SITE_HEALTH_FILE = "site_health.json"  # 放在DATA_DIR下
+SITE_HEALTH_TTL = 30 * 60  # 检测结果多久内直接用
+SITE_HEALTH_MAX_STALE = 24 * 3600  # 过期后这么久内先用旧结果、后台重新检测，再老的就当场检测
+SITE_HEALTH_FAILURE_TTL = 60  # 检测失败（包括超时）的结果只用这么久，过了就当场重新检测
+RANKING_PRIOR_SUCCESS_RATE = 0.7  # 推荐网站时，没爬过的网站先假设这么高的成功率
+RANKING_PARSE_BYTES_PER_SECOND = 20 * 1024 * 1024  # 估计解析速度，页面越大越慢
+
+# 录制/回放配置，用来离线做回归和性能测试
+REPLAY_MODE = None  # None: 正常联网；'record': 联网并录下所有响应；'replay': 只从档案回放，不联网
+REPLAY_ARCHIVE = "replay_archive.sqlite3"  # 放在DATA_DIR下
 
 # 日志配置
 LOG_LEVEL = "INFO"
@@ -28,7 +91,84 @@ HEADERS = {
     'Upgrade-Insecure-Requests': '1',
 }
 
+# 链接去重时去掉的跟踪参数，带不带这些参数都算同一篇文章
+TRACKING_PARAMS = [
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'spm', 'scm', 'from', 'fromsource', 'share_token', 'gclid', 'fbclid',
+]
+
+# 过滤规则配置，每组规则会合成一个正则，网站可以在NEWS_SITES里用"filters"追加自己的规则
+FILTER_RULES = {
+    # 排除非新闻链接（不区分大小写）
+    "link_exclude": [
+        r'javascript:',
+        r'mailto:',
+        r'^#',
+        r'\.(jpg|jpeg|png|gif|pdf|doc|docx|zip|rar|exe)$',
+        r'/search/',
+        r'/login',
+        r'/register',
+        r'/about',
+        r'/contact',
+        r'/privacy',
+        r'/terms',
+        r'/sitemap',
+        r'/rss',
+        r'/feed',
+        r'#comment',
+        r'#reply',
+    ],
+    # 新闻链接的特征，至少要命中一个
+    "link_include": [
+        r'/\d{4}/\d{2}/\d{2}/',  # 日期格式
+        r'/\d{4}-\d{2}-\d{2}/',  # 日期格式
+        r'/\d{8}/',              # 8位数字日期
+        r'\.html$',              # html结尾
+        r'\.shtml$',             # shtml结尾
+        r'/article/',            # 文章路径
+        r'/news/',               # 新闻路径
+        r'/finance/',            # 财经路径
+        r'/money/',              # 财经路径
+    ],
+    # 无效的标题
+    "title_exclude": [
+        r'更多$',  # 以"更多"结尾
+        r'^更多',  # 以"更多"开头
+        r'^\s*$',  # 只有空白字符
+        r'广告',   # 包含"广告"
+        r'版权',   # 包含"版权"
+        r'免责',   # 包含"免责"
+        r'登录',   # 包含"登录"
+        r'注册',   # 包含"注册"
+        r'客服',   # 包含"客服"
+        r'联系我们', # 包含"联系我们"
+        r'关于我们', # 包含"关于我们"
+        r'^[\d\s\-\|]+$',  # 只包含数字、空格、横线、竖线
+    ],
+    # 无效的段落
+    "paragraph_exclude": [
+        r'广告',
+        r'免责声明',
+        r'版权所有',
+        r'联系我们',
+        r'关于我们',
+        r'客服电话',
+        r'投诉建议',
+        r'意见反馈',
+        r'^\d+$',  # 只有数字
+        r'^[\s\-\|]+$',  # 只有空白和分隔符
+        r'分享到',
+        r'收藏',
+        r'点赞',
+        r'评论',
+        r'转发',
+        r'举报',
+    ],
+}
+
 # 支持的新闻网站配置
+# 可选项："start_urls"是首页之外的入口（栏目页、翻页），"filters"追加过滤规则，
+# "max_count"是多网站模式下这个网站的爬取额度（默认MAX_NEWS_COUNT）
 NEWS_SITES = {
     "网易财经": {
         "url": "https://money.163.com/",
@@ -2,14 +2,179 @@ import json
 import csv
 import pandas as pd
 import os
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from .config import (
+    JSONL_FSYNC_EVERY, JSONL_FSYNC_INTERVAL, SAVE_FORMATS, PARQUET_DATASET_DIR, PARQUET_COMPRESSION,
+    ARTICLE_DB_FILE, LOAD_CHUNK_SIZE
+)
+from .article_store import ArticleStore
+from .utils import canonicalize_url
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    # Parquet是可选的，没装pyarrow就只能存JSON/CSV/Excel
+    PARQUET_AVAILABLE = False
+
+# 格式 -> (保存方法名, 扩展名, 是否需要DataFrame)
+FORMAT_WRITERS = {
+    'json': ('save_to_json', 'json', False),
+    'csv': ('save_to_csv', 'csv', True),
+    'excel': ('save_to_excel', 'xlsx', True),
+    'parquet': ('save_to_parquet', 'parquet', True),
+    'sqlite': ('save_to_sqlite', 'sqlite3', False),
+}
+
+# JSON数组里元素之间的空白和逗号
+_JSON_SEPARATOR_RE = re.compile(r'[\s,]*')
+
+
+def _iter_json_array(filepath, chunk_size=LOAD_CHUNK_SIZE):
+    """
+    一条条读JSON数组文件里的元素，每次只读chunk_size个字符进内存
+    
+    开头不是'['的文件（比如网站健康记录）不是新闻列表，直接跳过
+    """
+    decoder = json.JSONDecoder()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith('['):
+            return
+        pos = 1
+        eof = False
+        while True:
+            pos = _JSON_SEPARATOR_RE.match(buffer, pos).end()
+            if buffer.startswith(']', pos):
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 元素被块的边界截断了，丢掉已经读完的部分，再读一块
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+
+
+def _iter_jsonl(filepath):
+    """一行行读JSONL，最后一行没写完（程序崩在写的时候）就跳过"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"跳过损坏的行: {filepath}:{line_number}")
+
+
+def _iter_csv(filepath):
+    """一行行读CSV，空单元格当成空字符串"""
+    with open(filepath, 'r', encoding='utf-8-sig', newline='') as f:
+        yield from csv.DictReader(f)
+
+
+# 格式 -> (扩展名, 读取函数)，iter_articles能读的格式
+FORMAT_READERS = {
+    'jsonl': ('.jsonl', _iter_jsonl),
+    'json': ('.json', _iter_json_array),
+    'csv': ('.csv', _iter_csv),
+}
+
+
+def _format_time(value):
+    """时间范围统一成crawl_time的字符串格式，直接按字符串比较"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class JsonlSink:
+    """
+    边爬边写的JSONL文件，一行一条新闻
+    
+    每条写完就flush，每隔几条或几秒fsync一次，程序崩了或者被中断，
+    已经写进去的新闻都还在，内存里也不用攒着所有新闻。多个线程可以同时写。
+    """
+    
+    def __init__(self, filepath, fsync_every=JSONL_FSYNC_EVERY, fsync_interval=JSONL_FSYNC_INTERVAL):
+        self.filepath = filepath
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self._lock = threading.Lock()
+        # 追加模式，同一个文件接着写也不会把之前的覆盖掉
+        self._file = open(filepath, 'a', encoding='utf-8')
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def write(self, news):
+        """写一条新闻"""
+        line = json.dumps(news, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.count += 1
+            self._unsynced += 1
+            if (self._unsynced >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+    
+    def pipe(self, news_iter):
+        """
+        生成器流水线的一环：每条新闻先写进文件再往下传
+        
+        比如 for news in sink.pipe(spider.iter_news(100)): ...
+        """
+        for news in news_iter:
+            self.write(news)
+            yield news
+    
+    def _sync(self):
+        """刷到磁盘，调用方需要持有锁"""
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+    
+    def close(self):
+        """刷盘并关闭文件"""
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            self._sync()
+            self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
 
 class DataManager:
     """数据管理类，负责保存和管理爬取的数据"""
     
     def __init__(self, data_dir="data"):
         self.data_dir = data_dir
+        # 最近一次save_all_formats每种格式的耗时（秒）
+        self.save_timings = {}
+        self._article_store = None
+        self._article_store_lock = threading.Lock()
         self.ensure_data_dir()
     
     def ensure_data_dir(self):
@@ -34,8 +199,8 @@ class DataManager:
             print(f"保存JSON文件失败: {e}")
             return None
     
-    def save_to_csv(self, data, filename=None):
-        """保存数据为CSV格式"""
+    def save_to_csv(self, data, filename=None, df=None):
+        """保存数据为CSV格式，已经建好DataFrame的话传df进来"""
         if not data:
             print("没有数据可保存")
             return None
@@ -47,7 +212,8 @@ class DataManager:
         filepath = os.path.join(self.data_dir, filename)
         
         try:
-            df = pd.DataFrame(data)
+            if df is None:
+                df = pd.DataFrame(data)
             df.to_csv(filepath, index=False, encoding='utf-8-sig')
             print(f"数据已保存为CSV格式: {filepath}")
             return filepath
@@ -55,8 +221,8 @@ class DataManager:
             print(f"保存CSV文件失败: {e}")
             return None
     
-    def save_to_excel(self, data, filename=None):
-        """保存数据为Excel格式"""
+    def save_to_excel(self, data, filename=None, df=None):
+        """保存数据为Excel格式，已经建好DataFrame的话传df进来"""
         if not data:
             print("没有数据可保存")
             return None
@@ -68,7 +234,8 @@ class DataManager:
         filepath = os.path.join(self.data_dir, filename)
         
         try:
-            df = pd.DataFrame(data)
+            if df is None:
+                df = pd.DataFrame(data)
             df.to_excel(filepath, index=False, engine='openpyxl')
             print(f"数据已保存为Excel格式: {filepath}")
             return filepath
@@ -76,6 +243,159 @@ class DataManager:
             print(f"保存Excel文件失败: {e}")
             return None
     
+    def save_to_parquet(self, data, filename=None, df=None):
+        """
+        追加到Parquet数据集，按网站和日期分区（hive风格的source=.../date=2025-07-08/xxx.parquet）
+        
+        注意pyarrow会把分区值做URL编码，目录名里的中文是百分号编码，比如网易财经的目录是
+        source=%E7%BD%91%E6%98%93%E8%B4%A2%E7%BB%8F，用pyarrow.dataset或pandas.read_parquet读的时候会自动解码。
+        source是字典编码，crawl_time存成时间戳，按PARQUET_COMPRESSION压缩，
+        分析时读整个目录，按网站、日期过滤只扫相关的文件
+        
+        Returns:
+            数据集目录，失败为None
+        """
+        if not PARQUET_AVAILABLE:
+            print("保存Parquet需要安装pyarrow: pip install pyarrow")
+            return None
+        if not data:
+            print("没有数据可保存")
+            return None
+        
+        if filename is None:
+            filename = f"news_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+        dataset_dir = os.path.join(self.data_dir, PARQUET_DATASET_DIR)
+        
+        try:
+            if df is None:
+                df = pd.DataFrame(data)
+            table_df = df.copy()
+            crawl_time = pd.to_datetime(table_df['crawl_time'], errors='coerce')
+            table_df['crawl_time'] = crawl_time.astype('datetime64[s]')
+            table_df['date'] = crawl_time.dt.strftime('%Y-%m-%d').fillna('unknown')
+            table_df['source'] = table_df['source'].fillna('未知').astype('category')
+            table = pa.Table.from_pandas(table_df, preserve_index=False)
+            
+            # 文件名带随机串，往同一个分区追加时不会覆盖以前的文件
+            stem = os.path.splitext(filename)[0]
+            pq.write_to_dataset(
+                table, dataset_dir,
+                partition_cols=['source', 'date'],
+                basename_template=f"{stem}-{uuid.uuid4().hex[:8]}-{{i}}.parquet",
+                existing_data_behavior='overwrite_or_ignore',
+                compression=PARQUET_COMPRESSION,
+            )
+            print(f"数据已追加到Parquet数据集: {dataset_dir}")
+            return dataset_dir
+        except Exception as e:
+            print(f"保存Parquet失败: {e}")
+            return None
+    
+    @property
+    def article_store(self):
+        """文章库，第一次用到时才打开"""
+        with self._article_store_lock:
+            if self._article_store is None:
+                self._article_store = ArticleStore(os.path.join(self.data_dir, ARTICLE_DB_FILE))
+            return self._article_store
+    
+    def save_to_sqlite(self, data, filename=None):
+        """
+        写进文章库，URL一样的文章更新而不是重复存
+        
+        文章库只有一个文件，一直累积，filename不用（为了和其他格式的保存方法参数一致）
+        
+        Returns:
+            文章库路径，失败为None
+        """
+        if not data:
+            print("没有数据可保存")
+            return None
+        
+        try:
+            count = self.article_store.upsert_many(data)
+            print(f"{count} 条新闻已写入文章库: {self.article_store.path} (共 {self.article_store.count()} 篇)")
+            return self.article_store.path
+        except Exception as e:
+            print(f"写入文章库失败: {e}")
+            return None
+    
+    def search_articles(self, keyword, source=None, limit=20):
+        """在所有爬过的文章里按关键词搜标题和摘要"""
+        return self.article_store.search(keyword, source, limit)
+    
+    def open_sink(self, filename_prefix="news"):
+        """
+        打开一个边爬边写的JSONL文件
+        
+        Returns:
+            JsonlSink: 用完要close，或者用with
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(self.data_dir, f"{filename_prefix}_{timestamp}.jsonl")
+        return JsonlSink(filepath)
+    
+    def list_data_files(self, formats=None):
+        """
+        DATA_DIR下保存过的数据文件，按修改时间从旧到新
+        
+        Args:
+            formats: 要哪些格式，默认FORMAT_READERS里全部
+            
+        Returns:
+            list: (格式, 文件路径)
+        """
+        extensions = {FORMAT_READERS[fmt][0]: fmt for fmt in (formats or FORMAT_READERS)}
+        files = []
+        for entry in os.scandir(self.data_dir):
+            fmt = extensions.get(os.path.splitext(entry.name)[1].lower())
+            if fmt and entry.is_file():
+                files.append((entry.stat().st_mtime, fmt, entry.path))
+        return [(fmt, path) for _, fmt, path in sorted(files)]
+    
+    def iter_articles(self, source=None, start=None, end=None, formats=None, unique=True):
+        """
+        遍历所有保存过的新闻，一条条读，不会把文件整个读进内存
+        
+        同一次爬取一般同时存了JSON、CSV和JSONL，默认按规范化URL去重，只保留第一次读到的
+        （内存里只存URL），没有URL的按标题和爬取时间去重。CSV读出来的值都是字符串。
+        
+        Args:
+            source: 只要这个网站的，可以是名称或者名称的列表
+            start: 爬取时间不早于这个，'2025-07-08 00:00:00'或datetime
+            end: 爬取时间早于这个
+            formats: 只读这些格式，默认json、jsonl、csv都读
+            unique: 是否按URL去重
+            
+        Yields:
+            dict: 新闻数据
+        """
+        sources = {source} if isinstance(source, str) else set(source) if source else None
+        start, end = _format_time(start), _format_time(end)
+        seen = set()
+        
+        for fmt, filepath in self.list_data_files(formats):
+            reader = FORMAT_READERS[fmt][1]
+            try:
+                for news in reader(filepath):
+                    if not isinstance(news, dict):
+                        continue
+                    if sources is not None and news.get('source') not in sources:
+                        continue
+                    crawl_time = news.get('crawl_time') or ''
+                    if (start and crawl_time < start) or (end and crawl_time >= end):
+                        continue
+                    if unique:
+                        url = news.get('url') or ''
+                        # 没有URL的（JSON里缺字段、CSV里是空串）按标题和爬取时间去重，不能都算成同一条
+                        key = canonicalize_url(url) or url or ('', news.get('title') or '', crawl_time)
+                        if key in seen:
+                            continue
+                        seen.add(key)
+                    yield news
+            except (OSError, ValueError, csv.Error) as e:
+                print(f"读取文件失败，跳过: {filepath} - {e}")
+    
     def load_from_json(self, filepath):
         """从JSON文件加载数据"""
         try:
@@ -87,6 +407,16 @@ class DataManager:
             print(f"加载JSON文件失败: {e}")
             return None
     
+    def load_from_jsonl(self, filepath):
+        """从JSONL文件加载数据，比如open_sink边爬边写的文件"""
+        try:
+            data = list(_iter_jsonl(filepath))
+            print(f"成功从JSONL文件加载数据: {filepath}")
+            return data
+        except Exception as e:
+            print(f"加载JSONL文件失败: {e}")
+            return None
+    
     def get_data_summary(self, data):
         """获取数据统计摘要"""
         if not data:
@@ -105,23 +435,59 @@ class DataManager:
             "摘要长度统计": {
                 "平均长度": sum(len(item.get('summary', '')) for item in data) / len(data),
                 "有摘要的新闻数": len([item for item in data if item.get('summary') and item.get('summary') != '暂无摘要'])
-            }
+            },
+            "来源统计": dict(Counter(item.get('source', '未知') for item in data))
         }
         
         return summary
     
-    def save_all_formats(self, data, filename_prefix=None):
-        """保存数据为所有格式"""
+    def save_all_formats(self, data, filename_prefix=None, formats=None):
+        """
+        保存数据为多种格式
+        
+        DataFrame只建一次，各个格式同时写，总耗时基本就是最慢的Excel那一个，
+        每种格式的耗时记在self.save_timings里
+        
+        Args:
+            data: 新闻列表
+            filename_prefix: 文件名前缀，默认news
+            formats: 要保存的格式，默认用配置里的SAVE_FORMATS
+            
+        Returns:
+            dict: 格式 -> 文件路径（失败为None）
+        """
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
         if filename_prefix is None:
             filename_prefix = "news"
+        if formats is None:
+            formats = SAVE_FORMATS
         
         base_filename = f"{filename_prefix}_{timestamp}"
         
+        unknown = [fmt for fmt in formats if fmt not in FORMAT_WRITERS]
+        if unknown:
+            print(f"不支持的保存格式，跳过: {', '.join(unknown)}")
+        formats = [fmt for fmt in dict.fromkeys(formats) if fmt in FORMAT_WRITERS]
+        
+        self.save_timings = {}
+        df = None
+        if any(FORMAT_WRITERS[fmt][2] for fmt in formats):
+            start_time = time.perf_counter()
+            df = pd.DataFrame(data)
+            self.save_timings['dataframe'] = time.perf_counter() - start_time
+        
+        def write(fmt):
+            method_name, extension, needs_df = FORMAT_WRITERS[fmt]
+            kwargs = {'df': df} if needs_df else {}
+            start_time = time.perf_counter()
+            filepath = getattr(self, method_name)(data, f"{base_filename}.{extension}", **kwargs)
+            return filepath, time.perf_counter() - start_time
+        
         results = {}
-        results['json'] = self.save_to_json(data, f"{base_filename}.json")
-        results['csv'] = self.save_to_csv(data, f"{base_filename}.csv")
-        results['excel'] = self.save_to_excel(data, f"{base_filename}.xlsx")
+        with ThreadPoolExecutor(max_workers=max(1, len(formats))) as executor:
+            futures = {fmt: executor.submit(write, fmt) for fmt in formats}
+            for fmt, future in futures.items():
+                results[fmt], self.save_timings[fmt] = future.result()
         
         return results
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+单遍提取引擎
+Author: GCH空城
+Date: 2025-07-08
+Description: 把一个网站配置的title/content/links选择器预编译好，遍历一次DOM就拿到所有选择器的匹配结果
+"""
+
+import re
+
+from bs4 import BeautifulSoup, Tag
+
+from .parser import FastElement
+
+# 选择器里的复合选择器，比如 a[href*='x'].title
+_COMPOUND_RE = re.compile(
+    r'''(?P<tag>\*|[a-zA-Z][\w-]*)?(?P<rest>(?:\.[\w-]+|\#[\w-]+|\[[^\]]+\])*)$'''
+)
+_PART_RE = re.compile(r'''\.(?P<cls>[\w-]+)|\#(?P<id>[\w-]+)|\[(?P<attr>[^\]]+)\]''')
+_ATTR_RE = re.compile(
+    r'''^\s*(?P<name>[\w-]+)\s*(?:(?P<op>[*^$~|]?=)\s*(?P<value>'[^']*'|"[^"]*"|[^\s'"]+))?\s*$'''
+)
+
+_ATTR_OPS = {
+    '=': lambda actual, expected: actual == expected,
+    '*=': lambda actual, expected: bool(expected) and expected in actual,
+    '^=': lambda actual, expected: bool(expected) and actual.startswith(expected),
+    '$=': lambda actual, expected: bool(expected) and actual.endswith(expected),
+    '~=': lambda actual, expected: expected in actual.split(),
+    '|=': lambda actual, expected: actual == expected or actual.startswith(expected + '-'),
+}
+
+
+def _attr_text(value):
+    """BeautifulSoup里class这种多值属性是列表，拼回字符串再比较"""
+    if isinstance(value, (list, tuple)):
+        return ' '.join(value)
+    return value
+
+
+def _class_list(value):
+    """取class列表，兼容BeautifulSoup（列表）和lxml（字符串）"""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return value.split()
+    return value
+
+
+class _Compound:
+    """一个复合选择器，比如 a.title[href*='x']"""
+
+    __slots__ = ('tag', 'classes', 'ids', 'attrs')
+
+    def __init__(self, text):
+        match = _COMPOUND_RE.match(text)
+        if not match or not text:
+            raise ValueError(text)
+        tag = match.group('tag')
+        self.tag = None if tag in (None, '*') else tag.lower()
+        self.classes = []
+        self.ids = []
+        self.attrs = []
+        for part in _PART_RE.finditer(match.group('rest')):
+            if part.group('cls'):
+                self.classes.append(part.group('cls'))
+            elif part.group('id'):
+                self.ids.append(part.group('id'))
+            else:
+                attr = _ATTR_RE.match(part.group('attr'))
+                if not attr:
+                    raise ValueError(text)
+                value = attr.group('value')
+                if value and value[0] in '\'"':
+                    value = value[1:-1]
+                self.attrs.append((attr.group('name').lower(), attr.group('op'), value))
+
+    def matches(self, name, attrs):
+        """检查一个元素是否满足这个复合选择器"""
+        if self.tag is not None and name != self.tag:
+            return False
+        if self.classes:
+            classes = _class_list(attrs.get('class'))
+            for cls in self.classes:
+                if cls not in classes:
+                    return False
+        for element_id in self.ids:
+            if attrs.get('id') != element_id:
+                return False
+        for attr_name, op, expected in self.attrs:
+            actual = attrs.get(attr_name)
+            if actual is None:
+                return False
+            if op is not None and not _ATTR_OPS[op](_attr_text(actual), expected):
+                return False
+        return True
+
+
+class _CompiledSelector:
+    """
+    编译好的选择器，支持 标签/.类/#id/[属性] 以及后代、子代组合符
+
+    从右往左匹配，和浏览器一个思路；语法不支持的选择器（伪类之类）会抛ValueError，
+    由调用方退回到tree.select()。
+    """
+
+    def __init__(self, selector):
+        tokens = selector.replace('>', ' > ').split()
+        if not tokens or tokens[0] == '>' or tokens[-1] == '>':
+            raise ValueError(selector)
+
+        # 从右往左存：[(复合选择器, 与右边一个的组合符)]
+        self.chain = []
+        combinator = None
+        for token in reversed(tokens):
+            if token == '>':
+                if combinator == '>':
+                    raise ValueError(selector)
+                combinator = '>'
+                continue
+            self.chain.append((_Compound(token), combinator))
+            combinator = ' '
+        self.subject = self.chain[0][0]
+
+    def matches(self, element, accessor, memo):
+        """
+        检查元素是否匹配整个选择器
+
+        Args:
+            element: 元素
+            accessor: 树的访问方式
+            memo: 同一次遍历共享的缓存，兄弟元素的祖先只需要算一次
+        """
+        name, attrs = accessor.describe(element)
+        if not self.subject.matches(name, attrs):
+            return False
+        return self._match_rest(element, 1, accessor, memo)
+
+    def _match_rest(self, element, index, accessor, memo):
+        """element已经匹配了chain[index-1]，检查chain[index:]能否在它的祖先上匹配"""
+        if index >= len(self.chain):
+            return True
+        parent = accessor.parent(element)
+        if parent is None:
+            return False
+        # chain[i]的组合符描述的是它和右边那个复合选择器的关系
+        compound, combinator = self.chain[index]
+        if combinator == '>':
+            name, attrs = accessor.describe(parent)
+            return compound.matches(name, attrs) and self._match_rest(parent, index + 1, accessor, memo)
+        return self._match_from(parent, index, accessor, memo)
+
+    def _match_from(self, element, index, accessor, memo):
+        """element或它的某个祖先能否匹配chain[index:]（后代组合符）"""
+        compound = self.chain[index][0]
+        visited = []
+        result = False
+        node = element
+        # 往上找，用循环不用递归，嵌套很深的烂页面也不会爆栈
+        while node is not None:
+            cached = memo.get((id(self), id(node), index))
+            if cached is not None:
+                result = cached[1]
+                break
+            visited.append(node)
+            name, attrs = accessor.describe(node)
+            if compound.matches(name, attrs) and self._match_rest(node, index + 1, accessor, memo):
+                result = True
+                break
+            node = accessor.parent(node)
+
+        # 路上经过的元素结论都一样，记下来给兄弟元素用；连元素一起存着，保证遍历期间id不会被复用
+        for node in visited:
+            memo[(id(self), id(node), index)] = (node, result)
+        return result
+
+
+class _SoupAccessor:
+    """BeautifulSoup树的访问方式"""
+
+    @staticmethod
+    def iter_elements(tree):
+        for node in tree.descendants:
+            if isinstance(node, Tag):
+                yield node
+
+    @staticmethod
+    def describe(element):
+        return element.name, element.attrs
+
+    @staticmethod
+    def wrap(element):
+        return element
+
+    @staticmethod
+    def parent(element):
+        parent = element.parent
+        if parent is None or isinstance(parent, BeautifulSoup):
+            return None
+        return parent
+
+
+class _FastAccessor:
+    """lxml-tree的访问方式"""
+
+    @staticmethod
+    def iter_elements(tree):
+        for node in tree.node.iter():
+            # 注释、处理指令的tag不是字符串
+            if isinstance(node.tag, str):
+                yield node
+
+    @staticmethod
+    def describe(element):
+        # lxml元素自己就有get方法，不用再建attrib代理
+        return element.tag, element
+
+    @staticmethod
+    def wrap(element):
+        return FastElement(element)
+
+    @staticmethod
+    def parent(element):
+        return element.getparent()
+
+
+class PageExtractor:
+    """
+    单遍提取器
+
+    初始化时把所有选择器编译好并按最右边的标签名/类名建索引，
+    collect()遍历一次DOM，每个元素只检查可能匹配它的选择器，
+    返回每个选择器的匹配结果（文档顺序，和soup.select一致）。
+    """
+
+    def __init__(self, selectors):
+        """
+        初始化提取器
+
+        Args:
+            selectors: 网站配置里的selectors字典，比如{'title': [...], 'content': [...]}
+        """
+        self.selectors = selectors
+        self._by_tag = {}
+        self._by_class = {}
+        self._generic = []
+        # 语法不支持的选择器，退回到tree.select()
+        self._fallback = []
+
+        seen = set()
+        for group in selectors.values():
+            for selector in group:
+                if selector in seen:
+                    continue
+                seen.add(selector)
+                self._compile(selector)
+
+    def _compile(self, selector):
+        """编译一个选择器（可能是逗号分隔的列表）并加到索引里"""
+        try:
+            compiled = [_CompiledSelector(part.strip()) for part in selector.split(',')]
+        except ValueError:
+            self._fallback.append(selector)
+            return
+
+        for item in compiled:
+            subject = item.subject
+            entry = (selector, item)
+            if subject.tag is not None:
+                self._by_tag.setdefault(subject.tag, []).append(entry)
+            elif subject.classes:
+                self._by_class.setdefault(subject.classes[0], []).append(entry)
+            else:
+                self._generic.append(entry)
+
+    def match_element(self, element, memo, accessor=_FastAccessor):
+        """
+        找出能匹配某个元素的选择器
+
+        只看元素本身和它的祖先，所以边解析边匹配也可以（元素开始时调用）
+
+        Args:
+            element: 元素（默认是lxml元素）
+            memo: 同一棵树共享的缓存
+            accessor: 树的访问方式
+
+        Returns:
+            list: 匹配的选择器
+        """
+        name, attrs = accessor.describe(element)
+        candidates = self._by_tag.get(name)
+        if self._by_class:
+            for cls in _class_list(attrs.get('class')):
+                entries = self._by_class.get(cls)
+                if entries:
+                    candidates = (candidates or []) + entries
+        if self._generic:
+            candidates = (candidates or []) + self._generic
+        if not candidates:
+            return ()
+
+        matched = []
+        for selector, compiled in candidates:
+            # 逗号列表里多个部分都匹配时只算一次
+            if selector in matched:
+                continue
+            if compiled.matches(element, accessor, memo):
+                matched.append(selector)
+        return matched
+
+    def collect(self, tree):
+        """
+        遍历一次DOM，收集所有选择器的匹配结果
+
+        Args:
+            tree: make_soup返回的树（BeautifulSoup或FastElement）
+
+        Returns:
+            dict: 选择器 -> 匹配到的元素列表
+        """
+        accessor = _FastAccessor if isinstance(tree, FastElement) else _SoupAccessor
+        results = {}
+        for group in self.selectors.values():
+            for selector in group:
+                results[selector] = []
+
+        memo = {}
+        for element in accessor.iter_elements(tree):
+            for selector in self.match_element(element, memo, accessor):
+                results[selector].append(element)
+
+        if accessor is _FastAccessor:
+            for selector, elements in results.items():
+                results[selector] = [accessor.wrap(element) for element in elements]
+
+        for selector in self._fallback:
+            try:
+                results[selector] = tree.select(selector)
+            except Exception:
+                results[selector] = []
+
+        return results
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+过滤规则
+Author: GCH空城
+Date: 2025-07-08
+Description: 链接、标题、段落的过滤规则，每个网站编译一次，每组规则合成一个正则只扫一遍
+"""
+
+import re
+
+from .config import FILTER_RULES
+
+# 规则组 -> 匹配时的正则参数
+RULE_FLAGS = {
+    'link_exclude': re.IGNORECASE,
+    'link_include': 0,
+    'title_exclude': 0,
+    'paragraph_exclude': 0,
+}
+
+
+def combine_patterns(patterns, flags=0):
+    """
+    把一组正则合成一个，命中任意一个就算命中
+
+    Args:
+        patterns: 正则字符串列表
+        flags: re的参数
+
+    Returns:
+        编译好的正则，列表为空时返回None
+    """
+    if not patterns:
+        return None
+    # 每条规则包一层非捕获组，^、$这些锚点只作用在自己那一条上
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), flags)
+
+
+def merge_rules(overrides=None):
+    """
+    合并默认规则和网站自己的规则
+
+    Args:
+        overrides: 网站配置里的filters，比如{'link_exclude': [...]}，会加在默认规则后面
+
+    Returns:
+        dict: 规则组 -> 正则列表
+    """
+    rules = {name: list(FILTER_RULES.get(name, [])) for name in RULE_FLAGS}
+    for name, patterns in (overrides or {}).items():
+        if name not in RULE_FLAGS:
+            raise ValueError(f"不支持的过滤规则: {name}，可选: {', '.join(RULE_FLAGS)}")
+        rules[name].extend(patterns)
+    return rules
+
+
+class SiteFilters:
+    """
+    一个网站的过滤规则
+
+    初始化时把每组规则编译成一个正则，之后每次判断只做一次search。
+    """
+
+    def __init__(self, overrides=None):
+        """
+        初始化过滤规则
+
+        Args:
+            overrides: 网站配置里的filters，没有就只用默认规则
+        """
+        self.rules = merge_rules(overrides)
+        compiled = {
+            name: combine_patterns(patterns, RULE_FLAGS[name])
+            for name, patterns in self.rules.items()
+        }
+        self._link_exclude = compiled['link_exclude']
+        self._link_include = compiled['link_include']
+        self._title_exclude = compiled['title_exclude']
+        self._paragraph_exclude = compiled['paragraph_exclude']
+
+    def is_news_link(self, url):
+        """不在排除规则里，并且带日期或新闻路径之类的特征"""
+        if self._link_exclude is not None and self._link_exclude.search(url):
+            return False
+        return self._link_include is not None and self._link_include.search(url) is not None
+
+    def is_valid_title(self, title):
+        """标题里没有广告、登录之类的字眼"""
+        return self._title_exclude is None or not self._title_exclude.search(title)
+
+    def is_valid_paragraph(self, text):
+        """段落里没有版权、分享之类的字眼"""
+        return self._paragraph_exclude is None or not self._paragraph_exclude.search(text)
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+待爬URL队列
+Author: GCH空城
+Date: 2025-07-08
+Description: 每个网站一个优先队列，按深度、URL里的日期、来源选择器排优先级，网站之间轮流出队
+"""
+
+import heapq
+import itertools
+from collections import deque, namedtuple
+
+from .config import MAX_CRAWL_DEPTH, FRONTIER_MAX_URLS
+from .urlset import URLSet
+from .utils import extract_date_from_url, extract_domain
+
+# 出队的条目：url、深度（首页上的链接是1）、来源选择器的序号
+FrontierEntry = namedtuple('FrontierEntry', ['url', 'depth', 'rank'])
+
+
+def url_priority(url, depth, rank=0):
+    """
+    计算URL的优先级，越小越先爬
+
+    浅的先爬（首页上的链接是编辑挑过的），同一层里日期新的先爬，
+    没日期的排在有日期的后面，最后看是哪个链接选择器找到的（越靠前越可靠）
+
+    Args:
+        url: URL
+        depth: 深度
+        rank: 链接选择器在配置里的序号
+
+    Returns:
+        tuple: 排序用的键
+    """
+    date = extract_date_from_url(url)
+    date_key = -int(date.replace('-', '')) if date else 0
+    return (depth, date_key, rank)
+
+
+class URLFrontier:
+    """
+    待爬URL队列
+
+    - 每个网站（域名）一个堆，出队时在网站之间轮流，不会一直盯着一个网站的一个栏目
+    - 加过的URL（规范化后）不会再加
+    - 超过最大深度的不要，总共收过的URL到上限后也不再收，内存有个上界
+    """
+
+    def __init__(self, max_depth=MAX_CRAWL_DEPTH, max_urls=FRONTIER_MAX_URLS):
+        """
+        初始化队列
+
+        Args:
+            max_depth: 最大深度，首页算0，首页上的链接算1
+            max_urls: 最多收多少个URL（包括已经出队的）
+        """
+        self.max_depth = max_depth
+        self.max_urls = max_urls
+        self._added = URLSet()
+        self._heaps = {}
+        # 有待爬URL的网站，轮流出队
+        self._hosts = deque()
+        self._counter = itertools.count()
+        self._size = 0
+
+    def add(self, url, depth, rank=0):
+        """
+        加一个URL
+
+        Args:
+            url: URL
+            depth: 深度
+            rank: 链接选择器的序号
+
+        Returns:
+            bool: 有没有加进去（太深、重复、满了都不加）
+        """
+        if depth > self.max_depth or len(self._added) >= self.max_urls:
+            return False
+        if not self._added.add(url):
+            return False
+
+        host = extract_domain(url).lower()
+        heap = self._heaps.get(host)
+        if heap is None:
+            heap = self._heaps[host] = []
+        if not heap:
+            self._hosts.append(host)
+        # 计数器保证优先级一样时先进先出
+        heapq.heappush(heap, (url_priority(url, depth, rank), next(self._counter), url, depth, rank))
+        self._size += 1
+        return True
+
+    def add_many(self, urls, depth, rank=0):
+        """批量加URL，返回实际加进去的个数"""
+        return sum(self.add(url, depth, rank) for url in urls)
+
+    def pop(self):
+        """
+        取下一个要爬的URL
+
+        Returns:
+            FrontierEntry或None（队列空了）
+        """
+        if not self._hosts:
+            return None
+        host = self._hosts.popleft()
+        heap = self._heaps[host]
+        _, _, url, depth, rank = heapq.heappop(heap)
+        if heap:
+            self._hosts.append(host)
+        self._size -= 1
+        return FrontierEntry(url, depth, rank)
+
+    def can_expand(self, depth):
+        """这个深度的页面上的链接还要不要"""
+        return depth < self.max_depth
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+首页共享
+Author: GCH空城
+Date: 2025-07-08
+Description: 一次运行里每个网站的首页只下载、解析一次，检测、推荐、爬取都用同一份
+"""
+
+import threading
+import time
+
+from .config import HOMEPAGE_REUSE_SECONDS
+from .parser import make_soup
+from .utils import canonicalize_url
+
+
+class HomepageSnapshot:
+    """
+    下载好的首页
+
+    soup第一次用到时才解析，之后大家共用（只读，别改）
+    """
+
+    def __init__(self, url, response, elapsed):
+        """
+        Args:
+            url: 首页URL
+            response: 200响应
+            elapsed: 请求耗时（秒）
+        """
+        self.url = url
+        self.response = response
+        self.elapsed = elapsed
+        self.fetched_at = time.monotonic()
+        self._soup = None
+        self._lock = threading.Lock()
+
+    @property
+    def soup(self):
+        with self._lock:
+            if self._soup is None:
+                self._soup = make_soup(self.response.content)
+            return self._soup
+
+    def age(self):
+        """下载了多少秒"""
+        return time.monotonic() - self.fetched_at
+
+
+class HomepageStore:
+    """
+    首页缓存
+
+    同一个首页同时只有一个线程在下载，其他线程等它下完直接用；
+    只存成功的结果，失败了下次还会重新请求
+    """
+
+    def __init__(self, max_age=HOMEPAGE_REUSE_SECONDS):
+        """
+        Args:
+            max_age: 下载多少秒内的首页可以直接用，过了就重新下载
+        """
+        self.max_age = max_age
+        self._snapshots = {}
+        self._url_locks = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url):
+        return canonicalize_url(url) or url
+
+    def get(self, url):
+        """
+        拿还能用的首页
+
+        Returns:
+            HomepageSnapshot或None
+        """
+        snapshot = self._snapshots.get(self._key(url))
+        if snapshot is None or snapshot.age() > self.max_age:
+            return None
+        return snapshot
+
+    def fetch(self, url, request_func):
+        """
+        拿首页，没有就下载
+
+        Args:
+            url: 首页URL
+            request_func: 真正发请求的函数，返回200响应，失败返回None
+
+        Returns:
+            HomepageSnapshot或None（下载失败）
+        """
+        key = self._key(url)
+        with self._lock:
+            url_lock = self._url_locks.setdefault(key, threading.Lock())
+
+        with url_lock:
+            snapshot = self.get(url)
+            if snapshot is not None:
+                return snapshot
+            start_time = time.monotonic()
+            response = request_func()
+            if response is None:
+                return None
+            return self.put(url, response, time.monotonic() - start_time)
+
+    def put(self, url, response, elapsed):
+        """存一个下载好的首页"""
+        snapshot = HomepageSnapshot(url, response, elapsed)
+        self._snapshots[self._key(url)] = snapshot
+        return snapshot
+
+    def clear(self):
+        """清空，下次都重新下载"""
+        self._snapshots.clear()
+
+
+# 全局共享，同一进程里的检测器和爬虫都用它
+default_homepages = HomepageStore()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP响应缓存
+Author: GCH空城
+Date: 2025-07-08
+Description: 把响应存到DATA_DIR下的SQLite里，用ETag/Last-Modified做条件请求，重复爬基本只花304
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlparse, urlunparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .config import (
+    DATA_DIR, HTTP_CACHE_ENABLED, HTTP_CACHE_FILE, HTTP_CACHE_TTL, HTTP_CACHE_MAX_SIZE,
+    REPLAY_MODE
+)
+from .utils import ensure_dir_exists
+
+# 这些头跟body的传输方式有关，缓存里的body已经解压过了，不用存
+SKIP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+
+def make_cache_key(url):
+    """
+    生成缓存键：scheme和域名转小写，去掉锚点
+
+    Args:
+        url: 原始URL
+
+    Returns:
+        str: 标准化后的URL
+    """
+    parsed = urlparse(url)
+    return urlunparse((
+        parsed.scheme.lower(), parsed.netloc.lower(), parsed.path or '/',
+        parsed.params, parsed.query, ''
+    ))
+
+
+class ResponseCache:
+    """
+    磁盘响应缓存
+
+    - TTL内的缓存直接返回，不发请求
+    - 过期的缓存带If-None-Match/If-Modified-Since去问，304就继续用旧的
+    - 总大小超过上限时按最近访问时间淘汰（LRU）
+    """
+
+    def __init__(self, path=None, ttl=HTTP_CACHE_TTL, max_size=HTTP_CACHE_MAX_SIZE):
+        """
+        初始化缓存
+
+        Args:
+            path: SQLite文件路径，默认放在DATA_DIR下
+            ttl: 缓存多少秒内算新鲜
+            max_size: 缓存总大小上限（字节）
+        """
+        if path is None:
+            ensure_dir_exists(DATA_DIR)
+            path = os.path.join(DATA_DIR, HTTP_CACHE_FILE)
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # 多个线程共用一个连接，靠自己的锁保证安全
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)'
+        )
+        self._conn.commit()
+
+    def _load(self, key):
+        """读取缓存记录"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, headers, body, fetched_at FROM responses WHERE url = ?',
+                (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, fetched_at = row
+        return {
+            'status': status,
+            'headers': json.loads(headers),
+            'body': body,
+            'fetched_at': fetched_at,
+        }
+
+    def _touch(self, key, refreshed=False):
+        """更新访问时间，304时顺便刷新抓取时间"""
+        now = time.time()
+        with self._lock:
+            if refreshed:
+                self._conn.execute(
+                    'UPDATE responses SET last_access = ?, fetched_at = ? WHERE url = ?',
+                    (now, now, key)
+                )
+            else:
+                self._conn.execute(
+                    'UPDATE responses SET last_access = ? WHERE url = ?', (now, key)
+                )
+            self._conn.commit()
+
+    def _store(self, key, response):
+        """保存200响应"""
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in SKIP_HEADERS
+        }
+        body = response.content
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(url, status, headers, body, size, fetched_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, response.status_code, json.dumps(headers), body, len(body), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """超过大小上限就把最久没用的删掉，调用方需要持有锁"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_size:
+            return
+        rows = self._conn.execute(
+            'SELECT url, size FROM responses ORDER BY last_access ASC'
+        ).fetchall()
+        for url, size in rows:
+            if total <= self.max_size:
+                break
+            self._conn.execute('DELETE FROM responses WHERE url = ?', (url,))
+            total -= size
+
+    def _build_response(self, entry, url):
+        """用缓存记录拼一个requests.Response出来"""
+        response = requests.models.Response()
+        response.status_code = entry['status']
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body']
+        response._content_consumed = True
+        response.url = url
+        response.elapsed = timedelta(0)
+        response.from_cache = True
+        return response
+
+    def get_fresh(self, url, max_age=None):
+        """
+        获取还在有效期内的缓存，不发任何请求
+
+        Args:
+            url: 页面URL
+            max_age: 有效期（秒），默认用self.ttl
+
+        Returns:
+            requests.Response或None
+        """
+        max_age = self.ttl if max_age is None else max_age
+        if max_age <= 0:
+            return None
+        key = make_cache_key(url)
+        entry = self._load(key)
+        if entry is None or time.time() - entry['fetched_at'] > max_age:
+            return None
+        self._touch(key)
+        return self._build_response(entry, url)
+
+    def fetch(self, session, url, max_age=None, **kwargs):
+        """
+        带缓存的GET请求
+
+        Args:
+            session: requests.Session
+            url: 页面URL
+            max_age: 有效期（秒），0表示一定要去服务器确认
+            **kwargs: 透传给session.get的参数
+
+        Returns:
+            requests.Response，304时返回用缓存拼出来的200响应
+        """
+        fresh = self.get_fresh(url, max_age)
+        if fresh is not None:
+            return fresh
+
+        key = make_cache_key(url)
+        entry = self._load(key)
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry is not None:
+            cached_headers = CaseInsensitiveDict(entry['headers'])
+            etag = cached_headers.get('ETag')
+            last_modified = cached_headers.get('Last-Modified')
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        response = session.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            self._touch(key, refreshed=True)
+            cached = self._build_response(entry, response.url or url)
+            cached.elapsed = response.elapsed
+            return cached
+
+        if response.status_code == 200:
+            self._store(key, response)
+        return response
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute('DELETE FROM responses')
+            self._conn.commit()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """
+    获取全局共享的响应缓存
+
+    Returns:
+        ResponseCache或None（配置里关掉了缓存或者在录制/回放时）
+    """
+    global _default_cache
+    # 录制/回放时不走缓存，否则录下来的是304或者干脆没发请求
+    if not HTTP_CACHE_ENABLED or REPLAY_MODE:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
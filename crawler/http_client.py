@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP客户端
+Author: GCH空城
+Date: 2025-07-08
+Description: 检测器、爬虫共用一个带连接池的Session，每个网站的TCP/TLS握手（和DNS查询）一次运行只做一次
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+from .replay import install_replay
+
+
+def create_session(pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE):
+    """
+    创建一个调好连接池的Session
+
+    Args:
+        pool_connections: 最多给多少个网站留连接池
+        pool_maxsize: 每个网站的连接池里最多留多少个keep-alive连接，要不小于单个网站的并发数
+
+    Returns:
+        requests.Session: 按REPLAY_MODE挂好了录制/回放
+    """
+    session = requests.Session()
+    # 重试由RetryPolicy管，这里不重试；连接不够时多开的连接用完就关，不会卡住
+    adapter_kwargs = {
+        'pool_connections': pool_connections,
+        'pool_maxsize': pool_maxsize,
+        'max_retries': 0,
+    }
+    adapter = HTTPAdapter(**adapter_kwargs)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return install_replay(session, **adapter_kwargs)
+
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+
+def get_default_session():
+    """
+    获取全局共享的Session，同一进程里的检测器和爬虫都用它
+
+    请求头每次请求时单独传，不要改session.headers，否则会影响别的组件
+    """
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
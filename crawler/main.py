@@ -15,9 +15,10 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from crawler.universal_spider import UniversalNewsSpider
+from crawler.multi_site import crawl_all_sites
 from crawler.data_manager import DataManager
 from crawler.site_detector import SiteDetector
-from crawler.config import NEWS_SITES
+from crawler.config import NEWS_SITES, ASYNC_CRAWL_ENABLED
 
 
 def show_banner():
@@ -33,7 +34,12 @@ def show_banner():
 
 
 def select_news_site():
-    """用户选择新闻网站"""
+    """
+    用户选择新闻网站
+    
+    Returns:
+        list: 要爬的网站名称，选了全部网站时有多个，取消或没有可用网站时为None
+    """
     print("正在检测可用的新闻网站...")
     print("(这可能需要一点时间，请耐心等待...)")
     detector = SiteDetector()
@@ -68,21 +74,30 @@ def select_news_site():
     site_list = list(available_sites.keys())
     for i, site_name in enumerate(site_list, 1):
         print(f"{i}. {site_name}")
+    all_choice = len(site_list) + 1
+    print(f"{all_choice}. 同时爬取所有可用网站")
     
     while True:
         try:
-            choice = input(f"\n请输入选择 (0-{len(site_list)}): ").strip()
+            choice = input(f"\n请输入选择 (0-{all_choice}): ").strip()
             choice_num = int(choice)
             
             if choice_num == 0:
                 # 自动选择
-                best_name, _ = detector.recommend_best_site()
+                best_name, best_info = detector.recommend_best_site()
+                if best_name is None:
+                    # 这时best_info是原因
+                    print(f"[ERROR] 自动选择失败: {best_info}")
+                    return None
                 print(f"[AUTO] 自动选择: {best_name}")
-                return best_name
+                return [best_name]
             elif 1 <= choice_num <= len(site_list):
                 selected_site = site_list[choice_num - 1]
                 print(f"[USER] 用户选择: {selected_site}")
-                return selected_site
+                return [selected_site]
+            elif choice_num == all_choice:
+                print(f"[USER] 同时爬取 {len(site_list)} 个网站")
+                return site_list
             else:
                 print("[ERROR] 选择无效，请重新输入")
         except ValueError:
@@ -92,36 +107,68 @@ def select_news_site():
             return None
 
 
+def crawl_single_site(selected_site, sink=None):
+    """爬一个网站，每爬到一篇就写进sink（传了sink时返回的列表是空的）"""
+    print(f"\n{'='*50}")
+    print(f"开始爬取: {selected_site}")
+    print(f"网站地址: {NEWS_SITES[selected_site]['url']}")
+    print(f"{'='*50}")
+    
+    # 创建爬虫实例
+    spider = UniversalNewsSpider(site_name=selected_site)
+    print("[OK] 爬虫初始化完成")
+    
+    # 开始爬取新闻
+    print(f"\n[START] 开始爬 {selected_site} 的新闻...")
+    print("(可能需要等一会儿，网站有时候比较慢)")
+    if ASYNC_CRAWL_ENABLED:
+        return spider.crawl_news_concurrent(sink=sink)
+    return spider.crawl_news(sink=sink)
+
+
+def crawl_multiple_sites(site_names, sink=None):
+    """同时爬多个网站，结果合并成一份（传了sink时都写进sink，返回的列表是空的）"""
+    print(f"\n{'='*50}")
+    print(f"同时爬取 {len(site_names)} 个网站: {', '.join(site_names)}")
+    print(f"{'='*50}")
+    print("(总耗时取决于最慢的那个网站)")
+    
+    # 菜单那里已经检测过了，不用再检测一遍
+    news_data, report = crawl_all_sites(site_names, detect=False, sink=sink)
+    
+    print("\n[STATS] 各网站爬取情况:")
+    for site_name, site_report in report.items():
+        status = "[FAIL]" if site_report['error'] else "[OK]"
+        print(f"{status} {site_name:12} - {site_report['count']}/{site_report['budget']} 条，耗时 {site_report['elapsed']}s")
+    return news_data
+
+
 def main():
     """主函数"""
     show_banner()
     
     try:
         # 用户选择新闻网站
-        selected_site = select_news_site()
-        if not selected_site:
+        selected_sites = select_news_site()
+        if not selected_sites:
             return
         
-        print(f"\n{'='*50}")
-        print(f"开始爬取: {selected_site}")
-        print(f"网站地址: {NEWS_SITES[selected_site]['url']}")
-        print(f"{'='*50}")
-        
-        # 创建爬虫实例
-        spider = UniversalNewsSpider(site_name=selected_site)
-        print("[OK] 爬虫初始化完成")
-        
-        # 创建数据管理器
+        # 创建数据管理器，爬到一篇就往JSONL里写一篇，中途挂了也不会全丢
         data_manager = DataManager()
         print("[OK] 数据管理器初始化完成")
         
-        # 开始爬取新闻
-        print(f"\n[START] 开始爬 {selected_site} 的新闻...")
-        print("(可能需要等一会儿，网站有时候比较慢)")
-        news_data = spider.crawl_news()
+        with data_manager.open_sink() as sink:
+            print(f"[OK] 边爬边保存到: {sink.filepath}")
+            if len(selected_sites) > 1:
+                crawl_multiple_sites(selected_sites, sink)
+            else:
+                crawl_single_site(selected_sites[0], sink)
+        
+        # 爬的时候新闻只写进了JSONL，内存里没攒，存其他格式前再读回来
+        news_data = data_manager.load_from_jsonl(sink.filepath)
         
         if not news_data:
-            print("[ERROR] 啥都没爬到，可能网站挂了或者被反爬了")
+            print("[ERROR] 啥都没爬到，可能网站挂了或者被反爬了，也可能没有新文章（爬过的会跳过）")
             return
         
         print(f"\n[SUCCESS] 成功爬到 {len(news_data)} 条新闻！")
@@ -146,8 +193,9 @@ def main():
         save_results = data_manager.save_all_formats(news_data)
         
         for format_type, filepath in save_results.items():
+            elapsed = data_manager.save_timings.get(format_type, 0)
             if filepath:
-                print(f"[OK] {format_type.upper()}文件已保存: {filepath}")
+                print(f"[OK] {format_type.upper()}文件已保存: {filepath} ({elapsed:.2f}s)")
             else:
                 print(f"[FAIL] {format_type.upper()}格式保存失败")
         
@@ -168,7 +216,7 @@ def main():
         
     except KeyboardInterrupt:
         print("\n\n[WARN] 用户手动停止了程序")
-        print("数据可能没保存完整，下次注意哦~")
+        print("已经爬到的新闻在data目录下的.jsonl文件里，其他格式可能没保存完整")
     except Exception as e:
         print(f"\n[ERROR] 程序出bug了: {e}")
         print("如果经常出现这个错误，可能是网站改版了")
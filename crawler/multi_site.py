@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多网站并发爬取
+Author: GCH空城
+Date: 2025-07-08
+Description: 所有可用网站同时爬，每个网站有自己的额度，结果合并成一份，总耗时接近最慢的那个网站
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import NEWS_SITES, MAX_NEWS_COUNT, ASYNC_CRAWL_ENABLED, MULTI_SITE_MAX_WORKERS
+from .universal_spider import UniversalNewsSpider
+from .site_detector import SiteDetector
+from .seen_urls import get_default_seen_store
+from .utils import setup_logger
+
+logger = setup_logger('multi_site')
+
+
+def get_site_budget(site_name):
+    """网站的爬取额度，NEWS_SITES里配了max_count就用它，否则用MAX_NEWS_COUNT"""
+    return NEWS_SITES[site_name].get('max_count', MAX_NEWS_COUNT)
+
+
+def _crawl_site(spider, max_count, sink=None):
+    """在线程里爬一个网站，网站之间互不影响"""
+    start_time = time.monotonic()
+    try:
+        if ASYNC_CRAWL_ENABLED:
+            news_data = spider.crawl_news_concurrent(max_count, sink=sink)
+        else:
+            news_data = spider.crawl_news(max_count, sink=sink)
+        # 传了sink时新闻只写进sink，返回的列表是空的
+        count = spider.last_crawl['succeeded']
+        error = None
+    except Exception as e:
+        logger.error(f"{spider.site_name} 爬取失败: {e}")
+        news_data = []
+        count = 0
+        error = str(e)
+    return news_data, {
+        'count': count,
+        'budget': max_count,
+        'elapsed': round(time.monotonic() - start_time, 2),
+        'error': error,
+    }
+
+
+def crawl_all_sites(site_names=None, max_workers=MULTI_SITE_MAX_WORKERS, detect=True, sink=None):
+    """
+    同时爬多个网站
+
+    Args:
+        site_names: 要爬的网站，默认NEWS_SITES里全部
+        max_workers: 最多同时爬几个网站
+        detect: 是否先检测，只爬检测通过的网站
+        sink: 边爬边写的输出，所有网站写同一个（JsonlSink可以多线程写），传了的话新闻不在内存里攒
+
+    Returns:
+        tuple: (合并后的新闻列表（按NEWS_SITES顺序，每条带source，传了sink时为空）, 每个网站的爬取报告)，
+            没传sink的话保存好之后要调用mark_saved
+    """
+    if site_names is None:
+        site_names = list(NEWS_SITES)
+
+    if detect:
+        available_sites, _ = SiteDetector().get_available_sites()
+        skipped = [name for name in site_names if name not in available_sites]
+        if skipped:
+            logger.warning(f"这些网站检测没通过，跳过: {', '.join(skipped)}")
+        site_names = [name for name in site_names if name in available_sites]
+
+    if not site_names:
+        logger.error("没有可以爬的网站")
+        return [], {}
+
+    # 爬虫在主线程里建好，日志之类的初始化不会在线程里抢
+    spiders = {name: UniversalNewsSpider(site_name=name) for name in site_names}
+
+    start_time = time.monotonic()
+    logger.info(f"开始同时爬取 {len(spiders)} 个网站: {', '.join(spiders)}")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {
+            name: executor.submit(_crawl_site, spider, get_site_budget(name), sink)
+            for name, spider in spiders.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+
+    news_data = []
+    report = {}
+    for name, (site_news, site_report) in results.items():
+        news_data.extend(site_news)
+        report[name] = site_report
+        logger.info(f"{name}: {site_report['count']}/{site_report['budget']} 条，耗时 {site_report['elapsed']}s")
+
+    total = sum(site_report['count'] for site_report in report.values())
+    logger.info(f"全部完成: 共 {total} 条新闻，总耗时 {time.monotonic() - start_time:.2f}s")
+    return news_data, report
+
+
+def mark_saved(news_data):
+    """crawl_all_sites返回的新闻保存好之后调用，记成爬过，下次跳过"""
+    seen = get_default_seen_store()
+    if seen is not None and news_data:
+        seen.add_news(news_data)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML解析后端
+Author: GCH空城
+Date: 2025-07-08
+Description: 统一创建页面树，解析器在config.py里选，默认用最快的lxml-tree
+"""
+
+import logging
+import threading
+from functools import lru_cache
+
+from bs4 import BeautifulSoup, FeatureNotFound, UnicodeDammit
+
+from .config import HTML_PARSER
+
+try:
+    import lxml.html
+    from lxml import etree
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    # 没装lxml或cssselect时lxml-tree后端不可用，会自动降级
+    CSSSelector = None
+
+# BeautifulSoup系的后端 -> BeautifulSoup的features参数
+# 都是BeautifulSoup树，soup.select走soupsieve，选择器语义不变
+SOUP_BACKENDS = {
+    'lxml': 'lxml',  # C实现的分词，但建树还是Python，requirements.txt里已经有了
+    'html.parser': 'html.parser',  # 标准库，不用装东西
+    'html5lib': 'html5lib',  # 和浏览器一样容错，最慢，需要另外装
+}
+
+# 类似selectolax的轻量树：直接用lxml的树，CSS选择器编译成XPath在C里跑，
+# 省掉BeautifulSoup建树的开销，解析+选择比BeautifulSoup快一个数量级
+FAST_BACKEND = 'lxml-tree'
+
+PARSER_BACKENDS = list(SOUP_BACKENDS) + [FAST_BACKEND]
+
+# 出问题时的保底解析器
+FALLBACK_PARSER = 'html.parser'
+
+# get_text时跳过这些标签里的内容，和BeautifulSoup的行为保持一致
+SKIP_TEXT_TAGS = ('script', 'style', 'template')
+
+_unavailable = set()
+_local = threading.local()
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=512)
+def _compile_selector(selector):
+    """把CSS选择器编译成XPath，同一个选择器只编译一次"""
+    return CSSSelector(selector, translator='html')
+
+
+if CSSSelector is not None:
+    _TEXT_XPATH = etree.XPath(
+        'descendant::text()[' +
+        ' and '.join(f'not(ancestor::{tag})' for tag in SKIP_TEXT_TAGS) +
+        ']'
+    )
+
+
+class FastElement:
+    """
+    lxml节点的轻量包装
+
+    只实现爬虫用到的那几个BeautifulSoup方法：select、find、get、get_text，
+    调用方不用关心底下是哪种树。
+    """
+
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def name(self):
+        """标签名"""
+        return self.node.tag
+
+    def select(self, selector):
+        """CSS选择器查找，结果按文档顺序"""
+        return [FastElement(node) for node in _compile_selector(selector)(self.node)]
+
+    def find(self, name):
+        """找第一个指定标签"""
+        for node in self.node.iter(name):
+            if node is not self.node:
+                return FastElement(node)
+        return None
+
+    def get(self, key, default=None):
+        """获取属性"""
+        return self.node.get(key, default)
+
+    def get_text(self, separator='', strip=False):
+        """获取文本内容，跳过script/style，和BeautifulSoup一致"""
+        texts = _TEXT_XPATH(self.node)
+        if strip:
+            texts = [text.strip() for text in texts]
+            texts = [text for text in texts if text]
+        return separator.join(texts)
+
+    def __repr__(self):
+        return f"<FastElement {self.node.tag}>"
+
+
+def _make_fast_tree(markup):
+    """
+    用lxml直接建树
+
+    lxml不收带编码声明（<?xml encoding=...?>）的str，会抛ValueError，
+    所以统一转成UTF-8字节，再用指定了UTF-8的解析器解析，页面里的编码声明就不起作用了
+    """
+    if isinstance(markup, bytes):
+        # 编码检测交给BeautifulSoup的UnicodeDammit，规则和BeautifulSoup建树时一样
+        markup = UnicodeDammit(markup, is_html=True).unicode_markup or ''
+    if not markup.strip():
+        # 空文档lxml会报错，给一个空树；别的解析错误照常抛出，由调用方处理
+        return FastElement(lxml.html.document_fromstring('<html></html>'))
+    root = lxml.html.document_fromstring(markup.encode('utf-8'), parser=_utf8_parser())
+    return FastElement(root)
+
+
+def _utf8_parser():
+    """固定按UTF-8解码的HTML解析器，lxml的解析器不能跨线程共用，每个线程建一个"""
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = lxml.html.HTMLParser(encoding='utf-8')
+    return parser
+
+
+def make_soup(markup, parser=None):
+    """
+    用配置的解析后端建树
+
+    Args:
+        markup: HTML内容（bytes或str）
+        parser: 解析后端名称，默认用config里的HTML_PARSER
+
+    Returns:
+        BeautifulSoup对象，或lxml-tree后端的FastElement
+    """
+    parser = parser or HTML_PARSER
+    if parser not in PARSER_BACKENDS:
+        raise ValueError(f"不支持的解析后端: {parser}，可选: {', '.join(PARSER_BACKENDS)}")
+
+    if parser == FAST_BACKEND:
+        if CSSSelector is not None:
+            return _make_fast_tree(markup)
+        if parser not in _unavailable:
+            _unavailable.add(parser)
+            logger.warning(f"解析后端 {parser} 需要lxml和cssselect，改用 lxml")
+        parser = 'lxml'
+
+    if parser not in _unavailable:
+        try:
+            return BeautifulSoup(markup, SOUP_BACKENDS[parser])
+        except FeatureNotFound:
+            # 没装对应的库就降级，只提示一次
+            _unavailable.add(parser)
+            logger.warning(f"解析后端 {parser} 不可用，改用 {FALLBACK_PARSER}")
+
+    return BeautifulSoup(markup, FALLBACK_PARSER)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制/回放
+Author: GCH空城
+Date: 2025-07-08
+Description: 把一次爬取的所有响应录到SQLite档案里，之后可以完全离线回放，方便做回归和性能测试
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import timedelta
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .config import DATA_DIR, REPLAY_MODE, REPLAY_ARCHIVE
+from .utils import ensure_dir_exists
+
+# 支持的模式
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+
+class ReplayArchive:
+    """
+    响应档案
+
+    每个(method, url)存一条，body用zlib压缩，一次爬取的档案一般就几MB。
+    """
+
+    def __init__(self, path):
+        """
+        打开（或创建）档案
+
+        Args:
+            path: SQLite文件路径
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS exchanges (
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                reason TEXT,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (method, url)
+            )
+        ''')
+        self._conn.commit()
+
+    def save(self, method, url, response):
+        """
+        录一条响应
+
+        Args:
+            method: 请求方法
+            url: 请求URL
+            response: requests.Response
+        """
+        headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')
+        }
+        body = zlib.compress(response.content or b'')
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO exchanges '
+                '(method, url, status, reason, headers, body, recorded_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (method, url, response.status_code, response.reason,
+                 json.dumps(headers), body, time.time())
+            )
+            self._conn.commit()
+
+    def load(self, method, url):
+        """
+        读取一条响应
+
+        Returns:
+            dict或None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT status, reason, headers, body FROM exchanges WHERE method = ? AND url = ?',
+                (method, url)
+            ).fetchone()
+        if row is None:
+            return None
+        status, reason, headers, body = row
+        return {
+            'status': status,
+            'reason': reason,
+            'headers': json.loads(headers),
+            'body': zlib.decompress(body),
+        }
+
+    def count(self):
+        """档案里录了多少条"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM exchanges').fetchone()[0]
+
+
+class RecordingAdapter(HTTPAdapter):
+    """照常发请求，顺手把响应录下来"""
+
+    def __init__(self, archive, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.archive = archive
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # 读一下content把body拿全，后面iter_content也能照常用
+        response.content
+        self.archive.save(request.method, request.url, response)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """不碰网络，直接从档案里返回响应，没录到的一律404"""
+
+    def __init__(self, archive):
+        super().__init__()
+        self.archive = archive
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        entry = self.archive.load(request.method, request.url)
+
+        response = requests.models.Response()
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(0)
+        # body已经在内存里了，没有raw连接可读
+        response._content_consumed = True
+        if entry is None:
+            response.status_code = 404
+            response.reason = 'Not Recorded'
+            response.headers = CaseInsensitiveDict()
+            response._content = b''
+        else:
+            response.status_code = entry['status']
+            response.reason = entry['reason']
+            response.headers = CaseInsensitiveDict(entry['headers'])
+            response._content = entry['body']
+        response.encoding = get_encoding_from_headers(response.headers)
+        return response
+
+    def close(self):
+        pass
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_archive(path=None):
+    """获取档案实例，同一个文件在进程里只打开一次"""
+    if path is None:
+        ensure_dir_exists(DATA_DIR)
+        path = os.path.join(DATA_DIR, REPLAY_ARCHIVE)
+    with _archives_lock:
+        if path not in _archives:
+            _archives[path] = ReplayArchive(path)
+        return _archives[path]
+
+
+def install_replay(session, mode=REPLAY_MODE, path=None, **adapter_kwargs):
+    """
+    按模式给session挂上录制或回放的适配器
+
+    Args:
+        session: requests.Session
+        mode: None / 'record' / 'replay'
+        path: 档案路径，默认DATA_DIR下的REPLAY_ARCHIVE
+        **adapter_kwargs: 录制时透传给HTTPAdapter的连接池参数
+
+    Returns:
+        requests.Session: 传进来的session
+    """
+    if not mode:
+        return session
+
+    archive = get_archive(path)
+    if mode == MODE_RECORD:
+        adapter = RecordingAdapter(archive, **adapter_kwargs)
+    elif mode == MODE_REPLAY:
+        adapter = ReplayAdapter(archive)
+    else:
+        raise ValueError(f"不支持的回放模式: {mode}")
+
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
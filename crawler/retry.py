@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重试策略
+Author: GCH空城
+Date: 2025-07-08
+Description: 指数退避 + 随机抖动 + Retry-After，不该重试的错误直接放弃
+"""
+
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from .config import MAX_RETRIES, RETRY_BACKOFF_BASE, RETRY_BACKOFF_MAX, RETRY_AFTER_MAX
+
+# 这些状态码重试一下可能就好了，其他的（404、403之类）重试也没用
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# 这些状态码会带Retry-After头，告诉我们该等多久
+RETRY_AFTER_STATUS_CODES = {429, 503}
+
+# 网络层面的临时错误，可以重试
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+)
+
+
+class RetryPolicy:
+    """
+    重试策略
+
+    只负责判断该不该重试、重试前等多久，真正的循环在调用方里写，
+    这样就不用递归调用，也不会每次重试都重新付一遍请求前的随机等待。
+    """
+
+    def __init__(self, max_attempts=MAX_RETRIES, backoff_base=RETRY_BACKOFF_BASE,
+                 backoff_max=RETRY_BACKOFF_MAX, retry_after_max=RETRY_AFTER_MAX):
+        """
+        初始化重试策略
+
+        Args:
+            max_attempts: 最多请求几次（包括第一次）
+            backoff_base: 退避基数（秒），第n次重试最多等 base * 2^n 秒
+            backoff_max: 单次退避最长等待（秒）
+            retry_after_max: Retry-After最多等多少秒，网站让等更久的话就不重试了
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+
+    def is_retryable_status(self, status_code):
+        """判断状态码是否值得重试"""
+        return status_code in RETRYABLE_STATUS_CODES
+
+    def is_retryable_exception(self, error):
+        """判断请求异常是否值得重试，URL写错之类的直接放弃"""
+        return isinstance(error, RETRYABLE_EXCEPTIONS)
+
+    def get_delay(self, attempt, response=None):
+        """
+        计算第attempt次失败后要等多久
+
+        Args:
+            attempt: 已经失败的次数减一（第一次失败传0）
+            response: 失败时的响应，用来读Retry-After
+
+        Returns:
+            float或None: 等待秒数；网站用Retry-After让等的时间超过retry_after_max时为None，
+                这时提前重试多半还是429/503，白白浪费一次请求，调用方应该放弃
+        """
+        retry_after = self._parse_retry_after(response)
+        if retry_after is not None:
+            return retry_after if retry_after <= self.retry_after_max else None
+
+        # full jitter：在[0, base * 2^attempt]之间随机，避免大家同时重试
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def _parse_retry_after(self, response):
+        """解析Retry-After头，支持秒数和HTTP日期两种格式"""
+        if response is None or response.status_code not in RETRY_AFTER_STATUS_CODES:
+            return None
+
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+
+        try:
+            retry_time = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_time.tzinfo is None:
+            retry_time = retry_time.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_time - datetime.now(timezone.utc)).total_seconds())
+
+    def sleep(self, attempt, response=None):
+        """
+        按退避策略等待
+
+        Returns:
+            float或None: 实际等待的秒数，None表示不该再重试（见get_delay），没有等
+        """
+        delay = self.get_delay(attempt, response)
+        if delay is not None and delay > 0:
+            time.sleep(delay)
+        return delay
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按网站的请求调度器
+Author: GCH空城
+Date: 2025-07-08
+Description: 记录每个域名下一次允许请求的时间，不同网站之间互不等待
+"""
+
+import asyncio
+import random
+import threading
+import time
+
+from .config import DELAY_RANGE, AUTOTHROTTLE_ENABLED, REPLAY_MODE
+from .throttle import default_throttle
+from .utils import extract_domain
+
+
+class HostScheduler:
+    """
+    按域名控制请求间隔
+
+    同一个域名的两次请求之间保持一定间隔，不同域名之间不用等，
+    所以多网站一起爬的时候总时间取决于最慢的那个网站。
+    配了限速器就用限速器给出的间隔（加点随机抖动），否则用固定的DELAY_RANGE。
+    线程安全，同步爬虫和异步引擎可以共用一个实例。
+    """
+
+    def __init__(self, delay_range=DELAY_RANGE, throttle=None):
+        """
+        初始化调度器
+
+        Args:
+            delay_range: 同一域名两次请求之间的间隔范围（秒），没有限速器时使用
+            throttle: AutoThrottle实例，为None时使用固定间隔
+        """
+        self.delay_range = delay_range
+        self.throttle = throttle
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+
+    def _get_interval(self, domain):
+        """计算同一域名下一次请求前的间隔"""
+        if self.throttle is not None:
+            # 在限速器给的间隔上下浮动50%，别太有规律
+            return self.throttle.get_delay(domain) * random.uniform(0.5, 1.5)
+        return random.uniform(*self.delay_range)
+
+    def reserve(self, url):
+        """
+        给url预约一个请求时间
+
+        Args:
+            url: 要请求的URL
+
+        Returns:
+            float: 距离预约时间还要等多少秒
+        """
+        domain = extract_domain(url)
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_allowed.get(domain, now))
+            self._next_allowed[domain] = start + self._get_interval(domain)
+        return start - now
+
+    def wait(self, url):
+        """阻塞等待直到可以请求url"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        """异步等待直到可以请求url"""
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# 全局共享的调度器，同一进程里的所有爬虫都按同一张时间表走
+if REPLAY_MODE == 'replay':
+    # 回放不碰网络，没必要等，按CPU速度跑
+    default_scheduler = HostScheduler(delay_range=(0, 0))
+else:
+    default_scheduler = HostScheduler(throttle=default_throttle if AUTOTHROTTLE_ENABLED else None)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+已爬URL索引
+Author: GCH空城
+Date: 2025-07-08
+Description: 把成功爬过的文章URL存到DATA_DIR下的SQLite里，所有网站共用，定时重跑时只爬新文章
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from .config import DATA_DIR, SEEN_URLS_ENABLED, SEEN_URLS_FILE, REPLAY_MODE
+from .utils import ensure_dir_exists, canonicalize_url
+
+# SQLite一条语句的参数个数有上限，批量查询时分批
+QUERY_BATCH_SIZE = 500
+
+
+class SeenURLStore:
+    """
+    已爬URL索引
+
+    URL先规范化再存（同一篇文章带不带跟踪参数算一个），
+    数据在磁盘上，内存里不用放整个集合，查询走主键索引。
+    """
+
+    def __init__(self, path=None):
+        """
+        初始化索引
+
+        Args:
+            path: SQLite文件路径，默认放在DATA_DIR下
+        """
+        if path is None:
+            ensure_dir_exists(DATA_DIR)
+            path = os.path.join(DATA_DIR, SEEN_URLS_FILE)
+        self.path = path
+        self._lock = threading.Lock()
+        # 多个线程共用一个连接，靠自己的锁保证安全
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS seen_urls (
+                url TEXT PRIMARY KEY,
+                site TEXT,
+                first_seen REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        self._conn.commit()
+
+    @staticmethod
+    def _key(url):
+        """规范化URL，无效URL就用原样"""
+        return canonicalize_url(url) or url
+
+    def __contains__(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM seen_urls WHERE url = ?', (self._key(url),)
+            ).fetchone()
+        return row is not None
+
+    def filter_new(self, urls):
+        """
+        过滤掉已经爬过的URL
+
+        Args:
+            urls: URL列表
+
+        Returns:
+            list: 没爬过的URL，顺序不变
+        """
+        keys = [self._key(url) for url in urls]
+        seen = set()
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique_keys), QUERY_BATCH_SIZE):
+                batch = unique_keys[start:start + QUERY_BATCH_SIZE]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT url FROM seen_urls WHERE url IN ({placeholders})', batch
+                ).fetchall()
+                seen.update(row[0] for row in rows)
+        return [url for url, key in zip(urls, keys) if key not in seen]
+
+    def add(self, url, site=None):
+        """记一个爬过的URL"""
+        self.add_many([url], site)
+
+    def add_many(self, urls, site=None):
+        """
+        批量记录爬过的URL
+
+        Args:
+            urls: URL列表
+            site: 网站名称
+        """
+        now = time.time()
+        rows = [(self._key(url), site, now) for url in urls]
+        if not rows:
+            return
+        with self._lock:
+            # 已经有的保留第一次的记录
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO seen_urls (url, site, first_seen) VALUES (?, ?, ?)', rows
+            )
+            self._conn.commit()
+
+    def add_news(self, news_data):
+        """
+        把保存好的新闻记为爬过，网站按每条新闻的source记
+
+        Args:
+            news_data: 新闻列表
+        """
+        by_site = {}
+        for news in news_data:
+            by_site.setdefault(news.get('source'), []).append(news['url'])
+        for site, urls in by_site.items():
+            self.add_many(urls, site)
+
+    def count(self, site=None):
+        """记了多少个URL，传site只算这个网站的"""
+        with self._lock:
+            if site is None:
+                return self._conn.execute('SELECT COUNT(*) FROM seen_urls').fetchone()[0]
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM seen_urls WHERE site = ?', (site,)
+            ).fetchone()[0]
+
+    def clear(self, site=None):
+        """清空索引，传site只清这个网站的"""
+        with self._lock:
+            if site is None:
+                self._conn.execute('DELETE FROM seen_urls')
+            else:
+                self._conn.execute('DELETE FROM seen_urls WHERE site = ?', (site,))
+            self._conn.commit()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_seen_store():
+    """
+    获取全局共享的已爬URL索引
+
+    Returns:
+        SeenURLStore或None（配置里关掉了或者在录制/回放时）
+    """
+    global _default_store
+    # 录制/回放要每次爬一样的文章，不能跳过
+    if not SEEN_URLS_ENABLED or REPLAY_MODE:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SeenURLStore()
+        return _default_store
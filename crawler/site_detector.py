@@ -8,13 +8,21 @@ Description: 检测和验证新闻网站的可用性和结构
 """
 
 import requests
-import time
 import logging
+from concurrent.futures import ThreadPoolExecutor, wait
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
-from .config import NEWS_SITES, REQUEST_TIMEOUT, CONNECTION_TEST_TIMEOUT
-from .utils import setup_logger
+from .config import NEWS_SITES, REQUEST_TIMEOUT, CONNECTION_TEST_TIMEOUT, SITE_DETECT_DEADLINE
+from .utils import setup_logger, is_valid_url
+from .http_cache import get_default_cache
+from .http_client import get_default_session
+from .parser import make_soup
+from .extractor import PageExtractor
+from .homepage import default_homepages
+from .site_health import get_default_health_registry
+from .site_ranking import rank_sites
+from .filters import SiteFilters
+from .urlset import URLSet
 
 
 class SiteDetector:
@@ -24,7 +32,12 @@ class SiteDetector:
         """初始化检测器"""
         self.logger = setup_logger('site_detector')
         self.ua = UserAgent()
-        self.session = requests.Session()
+        self.session = get_default_session()
+        self.cache = get_default_cache()
+        self.homepages = default_homepages
+        self.registry = get_default_health_registry()
+        # 最近一次检测的结果，推荐网站时直接用
+        self.last_results = None
         
     def get_headers(self):
         """获取随机请求头"""
@@ -38,90 +51,150 @@ class SiteDetector:
         }
     
     def test_site_connectivity(self, url):
-        """测试网站连通性"""
+        """测试网站连通性，首页下载一次存起来，后面的结构检测和爬取都直接用"""
+        snapshot = self.homepages.fetch(url, lambda: self._request_homepage(url))
+        if snapshot is None:
+            return False, None
+        return True, snapshot.response
+    
+    def _request_homepage(self, url):
+        """真正请求首页，成功返回响应，失败返回None"""
         try:
             self.logger.info(f"测试网站连通性: {url}")
-            response = self.session.get(
-                url, 
-                headers=self.get_headers(), 
-                timeout=CONNECTION_TEST_TIMEOUT,
-                allow_redirects=True
-            )
+            kwargs = {
+                'headers': self.get_headers(),
+                'timeout': CONNECTION_TEST_TIMEOUT,
+                'allow_redirects': True,
+            }
+            if self.cache is not None:
+                # 连通性测试必须真的问一下服务器，但没变化的话只收一个304
+                response = self.cache.fetch(self.session, url, max_age=0, **kwargs)
+            else:
+                response = self.session.get(url, **kwargs)
             
             if response.status_code == 200:
                 self.logger.info(f"✓ 网站可访问: {url} (状态码: {response.status_code})")
-                return True, response
+                return response
             else:
                 self.logger.warning(f"✗ 网站访问异常: {url} (状态码: {response.status_code})")
-                return False, None
+                return None
                 
         except requests.exceptions.ConnectTimeout:
             self.logger.error(f"✗ 连接超时: {url}")
-            return False, None
+            return None
         except requests.exceptions.ConnectionError:
             self.logger.error(f"✗ 连接错误: {url}")
-            return False, None
+            return None
         except requests.exceptions.RequestException as e:
             self.logger.error(f"✗ 请求异常: {url} - {e}")
-            return False, None
+            return None
         except Exception as e:
             self.logger.error(f"✗ 未知错误: {url} - {e}")
-            return False, None
+            return None
     
     def test_site_structure(self, url, selectors):
         """测试网站结构和选择器有效性"""
         try:
-            is_connected, response = self.test_site_connectivity(url)
-            if not is_connected:
+            # 连通性测试时已经下载过的话直接用，不再请求一次
+            snapshot = self.homepages.fetch(url, lambda: self._request_homepage(url))
+            if snapshot is None:
                 return False, "网站无法访问"
             
-            # 解析HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 测试标题选择器
-            title_found = False
-            title_selectors = selectors.get('title', [])
-            for selector in title_selectors:
-                elements = soup.select(selector)
-                if elements:
-                    # 检查是否有实际的文本内容
-                    valid_titles = [elem for elem in elements if elem.get_text(strip=True)]
-                    if valid_titles:
-                        title_found = True
-                        self.logger.info(f"✓ 找到标题选择器: {selector} (找到 {len(valid_titles)} 个)")
-                        break
-            
-            # 测试链接选择器
-            links_found = False
-            link_selectors = selectors.get('links', [])
-            for selector in link_selectors:
-                elements = soup.select(selector)
-                if elements:
-                    # 检查是否有href属性
-                    valid_links = [elem for elem in elements if elem.get('href')]
-                    if valid_links:
-                        links_found = True
-                        self.logger.info(f"✓ 找到链接选择器: {selector} (找到 {len(valid_links)} 个)")
-                        break
-            
-            # 判断结果
-            if title_found and links_found:
-                return True, "网站结构检测通过"
-            elif title_found:
-                return False, "找到标题但未找到有效链接"
-            elif links_found:
-                return False, "找到链接但未找到有效标题"
-            else:
-                return False, "未找到有效的标题和链接选择器"
+            # 解析HTML（同一个首页只解析一次）
+            is_valid, message, _ = self._check_structure(snapshot.soup, selectors, url)
+            return is_valid, message
                 
         except Exception as e:
             self.logger.error(f"结构检测异常: {url} - {e}")
             return False, f"结构检测异常: {e}"
     
-    def get_site_info(self, url, response):
-        """获取网站基本信息"""
+    def _check_structure(self, soup, selectors, page_url, filters=None):
+        """
+        检查选择器在页面上能不能用
+        
+        Args:
+            soup: 首页
+            selectors: 网站的选择器配置
+            page_url: 首页URL，补全相对链接用
+            filters: 网站的过滤规则，默认只用通用规则
+        
+        Returns:
+            tuple: (是否通过, 说明, 命中情况 {'title': {...}或None, 'links': {...}或None, 'news_links': 新闻链接数})
+        """
+        # 遍历一次页面，拿到所有选择器的匹配结果
+        matches = PageExtractor(selectors).collect(soup)
+        hits = {'title': None, 'links': None}
+        hits['news_links'] = self._count_news_links(matches, selectors, page_url, filters or SiteFilters())
+        
+        # 测试标题选择器
+        title_selectors = selectors.get('title', [])
+        for selector in title_selectors:
+            elements = matches.get(selector, [])
+            if elements:
+                # 检查是否有实际的文本内容
+                valid_titles = [elem for elem in elements if elem.get_text(strip=True)]
+                if valid_titles:
+                    hits['title'] = {'selector': selector, 'count': len(valid_titles)}
+                    self.logger.info(f"✓ 找到标题选择器: {selector} (找到 {len(valid_titles)} 个)")
+                    break
+        
+        # 测试链接选择器
+        link_selectors = selectors.get('links', [])
+        for selector in link_selectors:
+            elements = matches.get(selector, [])
+            if elements:
+                # 检查是否有href属性
+                valid_links = [elem for elem in elements if elem.get('href')]
+                if valid_links:
+                    hits['links'] = {'selector': selector, 'count': len(valid_links)}
+                    self.logger.info(f"✓ 找到链接选择器: {selector} (找到 {len(valid_links)} 个)")
+                    break
+        
+        # 判断结果
+        title_found = hits['title'] is not None
+        links_found = hits['links'] is not None
+        if title_found and links_found:
+            return True, "网站结构检测通过", hits
+        elif title_found:
+            return False, "找到标题但未找到有效链接", hits
+        elif links_found:
+            return False, "找到链接但未找到有效标题", hits
+        else:
+            return False, "未找到有效的标题和链接选择器", hits
+    
+    @staticmethod
+    def _count_news_links(matches, selectors, page_url, filters):
+        """
+        首页上爬虫实际会去爬的新闻链接数
+        
+        和爬虫提取链接的规则一样：按顺序找第一个能找到新闻链接的选择器，过滤后去重
+        """
+        for selector in selectors.get('links', []):
+            links = URLSet()
+            for element in matches.get(selector, []):
+                href = element.get('href')
+                if not href:
+                    continue
+                full_url = href if href.startswith('http') else urljoin(page_url, href)
+                if is_valid_url(full_url) and filters.is_news_link(full_url):
+                    links.add(full_url)
+            if links:
+                return len(links)
+        return 0
+    
+    def get_site_info(self, url, response, soup=None, response_time=None):
+        """
+        获取网站基本信息
+        
+        Args:
+            url: 网站地址
+            response: 首页响应
+            soup: 已经解析过的首页，不传就重新解析
+            response_time: 请求耗时（秒），不传就用响应里记的
+        """
         try:
-            soup = BeautifulSoup(response.content, 'html.parser')
+            if soup is None:
+                soup = make_soup(response.content)
             
             # 获取网站标题
             title_tag = soup.find('title')
@@ -133,67 +206,159 @@ class SiteDetector:
             # 获取页面大小
             content_length = len(response.content)
             
+            # 请求耗时，推荐网站时用来估计爬取速度
+            if response_time is None:
+                response_time = response.elapsed.total_seconds()
+            
             return {
                 'title': site_title,
                 'encoding': charset,
                 'content_length': content_length,
-                'status_code': response.status_code
+                'status_code': response.status_code,
+                'response_time': round(response_time, 3)
             }
         except Exception as e:
             self.logger.error(f"获取网站信息失败: {e}")
             return None
     
-    def detect_all_sites(self):
-        """检测所有配置的新闻网站"""
-        self.logger.info("开始检测所有配置的新闻网站...")
-        results = {}
+    def detect_site(self, site_name, site_config):
+        """
+        检测单个网站
         
-        for site_name, site_config in NEWS_SITES.items():
-            self.logger.info(f"\n正在检测: {site_name}")
-            
-            url = site_config['url']
-            selectors = site_config['selectors']
-            
-            # 测试连通性
-            is_connected, response = self.test_site_connectivity(url)
+        Returns:
+            dict: 检测结果，格式同detect_all_sites里的每一项
+        """
+        self.logger.info(f"正在检测: {site_name}")
+        
+        url = site_config['url']
+        selectors = site_config['selectors']
+        
+        # 测试连通性，首页下载一次存起来
+        snapshot = self.homepages.fetch(url, lambda: self._request_homepage(url))
+        
+        if snapshot is None:
+            self.logger.error(f"✗ {site_name}: 网站无法访问")
+            return self._failed_result(url, '网站无法访问')
+        
+        # 测试结构，用的是刚才下载的首页
+        try:
+            filters = SiteFilters(site_config.get('filters'))
+            is_valid, message, selector_hits = self._check_structure(snapshot.soup, selectors, url, filters)
+        except Exception as e:
+            self.logger.error(f"结构检测异常: {url} - {e}")
+            is_valid, message, selector_hits = False, f"结构检测异常: {e}", None
+        
+        # 获取网站信息
+        site_info = self.get_site_info(url, snapshot.response, snapshot.soup, snapshot.elapsed)
+        
+        if is_valid:
+            self.logger.info(f"[OK] {site_name}: {message}")
+        else:
+            self.logger.warning(f"[WARN] {site_name}: {message}")
+        
+        return {
+            'status': 'success' if is_valid else 'partial',
+            'message': message,
+            'url': url,
+            'info': site_info,
+            'selectors_valid': is_valid,
+            'selector_hits': selector_hits
+        }
+    
+    @staticmethod
+    def _failed_result(url, message):
+        """检测失败的结果"""
+        return {
+            'status': 'failed',
+            'message': message,
+            'url': url,
+            'info': None,
+            'selectors_valid': False,
+            'selector_hits': None
+        }
+    
+    def detect_all_sites(self, deadline=SITE_DETECT_DEADLINE, site_names=None):
+        """
+        检测所有配置的新闻网站
+        
+        所有网站同时检测，启动时间取决于最慢的网站而不是所有网站加起来；
+        到了deadline还没检测完的网站算失败，不再等它。检测结果会记到网站健康记录里
+        
+        Args:
+            deadline: 整体检测最多等多少秒
+            site_names: 只检测这些网站，默认全部
             
-            if is_connected:
-                # 测试结构
-                is_valid, message = self.test_site_structure(url, selectors)
-                
-                # 获取网站信息
-                site_info = self.get_site_info(url, response)
-                
-                results[site_name] = {
-                    'status': 'success' if is_valid else 'partial',
-                    'message': message,
-                    'url': url,
-                    'info': site_info,
-                    'selectors_valid': is_valid
-                }
-                
-                if is_valid:
-                    self.logger.info(f"[OK] {site_name}: {message}")
-                else:
-                    self.logger.warning(f"[WARN] {site_name}: {message}")
+        Returns:
+            dict: 网站名称 -> 检测结果，顺序和NEWS_SITES一致
+        """
+        if site_names is None:
+            site_names = list(NEWS_SITES)
+        sites = {name: config for name, config in NEWS_SITES.items() if name in site_names}
+        self.logger.info(f"开始检测 {len(sites)} 个新闻网站...")
+        
+        executor = ThreadPoolExecutor(max_workers=max(1, len(sites)))
+        futures = {
+            site_name: executor.submit(self.detect_site, site_name, site_config)
+            for site_name, site_config in sites.items()
+        }
+        wait(futures.values(), timeout=deadline)
+        # 还没开始的取消掉，已经在跑的不等了，让它自己跑完
+        # （shutdown的cancel_futures参数要Python 3.9，这里自己取消）
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=False)
+        
+        results = {}
+        for site_name, future in futures.items():
+            url = NEWS_SITES[site_name]['url']
+            if not future.done() or future.cancelled():
+                self.logger.error(f"✗ {site_name}: {deadline}秒内没检测完")
+                results[site_name] = self._failed_result(url, '检测超时')
+            elif future.exception() is not None:
+                self.logger.error(f"✗ {site_name}: 检测异常 - {future.exception()}")
+                results[site_name] = self._failed_result(url, f'检测异常: {future.exception()}')
             else:
-                results[site_name] = {
-                    'status': 'failed',
-                    'message': '网站无法访问',
-                    'url': url,
-                    'info': None,
-                    'selectors_valid': False
-                }
-                self.logger.error(f"✗ {site_name}: 网站无法访问")
-            
-            # 添加延迟避免请求过快
-            time.sleep(1)
+                results[site_name] = future.result()
         
+        if self.registry is not None:
+            self.registry.update(sites, results)
+        self.last_results = results
         return results
     
-    def get_available_sites(self):
-        """获取所有可用的新闻网站"""
-        detection_results = self.detect_all_sites()
+    def load_results(self):
+        """
+        获取所有网站的检测结果，优先用网站健康记录
+        
+        记录还新鲜的直接用；过期不久的先用着，后台重新检测；没有记录的当场检测。
+        一般情况下启动时不用发任何请求
+        
+        Returns:
+            dict: 网站名称 -> 检测结果，顺序和NEWS_SITES一致
+        """
+        if self.registry is None:
+            return self.detect_all_sites()
+        
+        cached, stale, missing = self.registry.lookup(NEWS_SITES)
+        if missing:
+            cached.update(self.detect_all_sites(site_names=missing))
+        if stale:
+            # 后台用新的检测器，别和当前这个抢last_results
+            self.registry.refresh_in_background(
+                stale, lambda names: SiteDetector().detect_all_sites(site_names=names)
+            )
+        
+        self.last_results = {name: cached[name] for name in NEWS_SITES if name in cached}
+        return self.last_results
+    
+    def get_available_sites(self, detection_results=None):
+        """
+        获取所有可用的新闻网站
+        
+        Args:
+            detection_results: 已有的检测结果，不传就按load_results取
+        """
+        if detection_results is None:
+            detection_results = self.load_results()
         available_sites = {}
         
         for site_name, result in detection_results.items():
@@ -203,14 +368,27 @@ class SiteDetector:
         return available_sites, detection_results
     
     def recommend_best_site(self):
-        """推荐最佳可用网站"""
-        available_sites, detection_results = self.get_available_sites()
+        """
+        推荐最佳可用网站，这个检测器已经检测过的话直接用上次的结果
+        
+        选预计每秒能爬到最多文章的网站，见site_ranking
+        """
+        available_sites, detection_results = self.get_available_sites(self.last_results)
         
         if not available_sites:
             return None, "没有找到可用的新闻网站"
         
-        # 简单推荐策略：选择第一个可用的网站
-        best_site_name = list(available_sites.keys())[0]
+        # 按估计的每秒文章数排序，一样的话保持NEWS_SITES里的顺序
+        crawl_stats = {}
+        if self.registry is not None:
+            crawl_stats = {name: self.registry.get_crawl_stats(name) for name in available_sites}
+        ranking = rank_sites(
+            {name: detection_results[name] for name in available_sites}, crawl_stats
+        )
+        for site_name, score in ranking:
+            self.logger.info(f"{site_name}: 预计每秒 {score:.2f} 篇")
+        
+        best_site_name = ranking[0][0]
         best_site_config = available_sites[best_site_name]
         
         return best_site_name, best_site_config
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网站健康记录
+Author: GCH空城
+Date: 2025-07-08
+Description: 把每个网站最近一次的检测结果存到DATA_DIR下的JSON里，TTL内直接用，过期的在后台重新检测
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .config import (
+    DATA_DIR, SITE_HEALTH_ENABLED, SITE_HEALTH_FILE, SITE_HEALTH_TTL, SITE_HEALTH_MAX_STALE,
+    SITE_HEALTH_FAILURE_TTL, REPLAY_MODE
+)
+from .utils import ensure_dir_exists, setup_logger
+
+# 爬取统计的平滑系数，越大越看重最近一次
+CRAWL_STATS_ALPHA = 0.5
+
+
+def config_fingerprint(site_config):
+    """网站配置的指纹，改了地址或选择器之后旧的检测结果就不算数了"""
+    text = json.dumps(site_config, sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+class SiteHealthRegistry:
+    """
+    网站健康记录
+
+    每个网站一条：检测结果（状态、首页信息和耗时、命中的选择器）、检测时间、配置指纹，
+    另外记着最近几次爬取的成功率（推荐网站时用）。
+    - 不超过ttl的直接用
+    - 超过ttl但不超过max_stale的先用着，同时在后台重新检测
+    - 再老的、没有的、配置改过的，只能当场检测
+    - 检测失败的（包括超时）多半是临时问题，只在failure_ttl内用，过了就当场检测，不进后台刷新
+    """
+
+    def __init__(self, path=None, ttl=SITE_HEALTH_TTL, max_stale=SITE_HEALTH_MAX_STALE,
+                 failure_ttl=SITE_HEALTH_FAILURE_TTL):
+        """
+        初始化
+
+        Args:
+            path: JSON文件路径，默认放在DATA_DIR下
+            ttl: 检测结果多少秒内算新鲜
+            max_stale: 过期多久以内还可以先用着
+            failure_ttl: 检测失败的结果多少秒内算新鲜
+        """
+        if path is None:
+            ensure_dir_exists(DATA_DIR)
+            path = os.path.join(DATA_DIR, SITE_HEALTH_FILE)
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.failure_ttl = failure_ttl
+        self.logger = setup_logger('site_health')
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._entries, self._crawls = self._load()
+
+    def _load(self):
+        """读文件，文件坏了就当没有记录"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('sites', {}), data.get('crawls', {})
+        except FileNotFoundError:
+            return {}, {}
+        except (OSError, ValueError, AttributeError) as e:
+            self.logger.warning(f"网站健康记录读取失败，重新检测: {e}")
+            return {}, {}
+
+    def _save(self):
+        """先写临时文件再替换，写到一半程序退出也不会把文件写坏"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'sites': self._entries, 'crawls': self._crawls}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _save_quietly(self):
+        try:
+            self._save()
+        except OSError as e:
+            self.logger.warning(f"网站健康记录保存失败: {e}")
+
+    def lookup(self, sites):
+        """
+        查一批网站的记录
+
+        Args:
+            sites: 网站名称 -> 网站配置
+
+        Returns:
+            tuple: (能用的结果 {网站名称: 检测结果}, 需要后台刷新的网站, 必须当场检测的网站)
+        """
+        now = time.time()
+        results, stale, missing = {}, [], []
+        with self._lock:
+            for site_name, site_config in sites.items():
+                entry = self._entries.get(site_name)
+                if entry is None or entry.get('fingerprint') != config_fingerprint(site_config):
+                    missing.append(site_name)
+                    continue
+                age = now - entry['checked_at']
+                if entry['result'].get('status') == 'failed':
+                    if age > self.failure_ttl:
+                        missing.append(site_name)
+                    else:
+                        results[site_name] = entry['result']
+                    continue
+                if age > self.ttl + self.max_stale:
+                    missing.append(site_name)
+                    continue
+                if age > self.ttl:
+                    stale.append(site_name)
+                results[site_name] = entry['result']
+        return results, stale, missing
+
+    def update(self, sites, results):
+        """
+        记下检测结果并写盘
+
+        Args:
+            sites: 网站名称 -> 网站配置
+            results: 网站名称 -> 检测结果
+        """
+        now = time.time()
+        with self._lock:
+            for site_name, result in results.items():
+                self._entries[site_name] = {
+                    'checked_at': now,
+                    'fingerprint': config_fingerprint(sites[site_name]),
+                    'result': result,
+                }
+            self._save_quietly()
+
+    def record_crawl(self, site_name, attempted, succeeded):
+        """
+        记一次爬取的结果，成功率做指数平滑，偶尔一次网络抖动不会把网站打入冷宫
+
+        Args:
+            site_name: 网站名称
+            attempted: 尝试了多少篇文章
+            succeeded: 成功了多少篇
+        """
+        if attempted <= 0:
+            return
+        success_rate = succeeded / attempted
+        with self._lock:
+            stats = self._crawls.get(site_name)
+            if stats is None:
+                stats = {'runs': 0, 'success_rate': success_rate}
+            else:
+                stats['success_rate'] += CRAWL_STATS_ALPHA * (success_rate - stats['success_rate'])
+            stats['runs'] += 1
+            stats['last_crawl_at'] = time.time()
+            self._crawls[site_name] = stats
+            self._save_quietly()
+
+    def get_crawl_stats(self, site_name):
+        """
+        网站最近的爬取统计
+
+        Returns:
+            dict或None: {'runs', 'success_rate', 'last_crawl_at'}
+        """
+        with self._lock:
+            stats = self._crawls.get(site_name)
+            return dict(stats) if stats else None
+
+    def refresh_in_background(self, site_names, detect_func):
+        """
+        在后台线程里重新检测，正在刷新的网站不会重复提交
+
+        Args:
+            site_names: 要刷新的网站
+            detect_func: 检测函数，传入网站名称列表，检测完自己调用update
+        """
+        with self._lock:
+            site_names = [name for name in site_names if name not in self._refreshing]
+            self._refreshing.update(site_names)
+        if not site_names:
+            return None
+
+        def run():
+            try:
+                detect_func(site_names)
+            except Exception as e:
+                self.logger.warning(f"后台检测失败: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update(site_names)
+
+        self.logger.info(f"检测结果过期，后台重新检测: {', '.join(site_names)}")
+        # 守护线程，主程序结束了就不管它了
+        thread = threading.Thread(target=run, name='site-health-refresh', daemon=True)
+        thread.start()
+        return thread
+
+    def clear(self):
+        """清空记录，下次全部重新检测"""
+        with self._lock:
+            self._entries = {}
+            self._crawls = {}
+            self._save()
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_default_health_registry():
+    """
+    获取全局共享的网站健康记录
+
+    Returns:
+        SiteHealthRegistry或None（配置里关掉了或者在录制/回放时）
+    """
+    global _default_registry
+    # 录制/回放要每次都真的检测一遍
+    if not SITE_HEALTH_ENABLED or REPLAY_MODE:
+        return None
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = SiteHealthRegistry()
+        return _default_registry
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网站排序
+Author: GCH空城
+Date: 2025-07-08
+Description: 根据检测时测到的响应时间、页面大小、新闻链接数和以前的爬取成功率，估计每个网站每秒能爬到几篇文章
+"""
+
+from .config import (
+    MAX_NEWS_COUNT, DELAY_RANGE, AUTOTHROTTLE_ENABLED, AUTOTHROTTLE_MIN_DELAY,
+    AUTOTHROTTLE_MAX_DELAY, AUTOTHROTTLE_TARGET_CONCURRENCY,
+    RANKING_PRIOR_SUCCESS_RATE, RANKING_PARSE_BYTES_PER_SECOND
+)
+
+
+def estimate_request_interval(latency):
+    """
+    估计稳定后同一个网站两次请求之间隔多久
+
+    和限速器的算法一样：间隔往 延迟/目标并发数 靠拢，并且夹在最小、最大间隔之间；
+    关了自适应限速就是DELAY_RANGE的平均值
+    """
+    if not AUTOTHROTTLE_ENABLED:
+        return sum(DELAY_RANGE) / 2
+    interval = latency / max(AUTOTHROTTLE_TARGET_CONCURRENCY, 0.1)
+    return min(max(interval, AUTOTHROTTLE_MIN_DELAY), AUTOTHROTTLE_MAX_DELAY)
+
+
+def estimate_article_rate(result, crawl_stats=None, budget=MAX_NEWS_COUNT):
+    """
+    估计爬一个网站时每秒能拿到几篇文章
+
+    - 文章页的请求耗时按首页的算，页面越大解析越慢，再加上解析时间
+    - 请求间隔按限速器稳定后的间隔算
+    - 成功率用以前的爬取记录，没爬过就用先验值
+    - 首页上的新闻链接不够额度的话，首页那一次请求摊到更少的文章上
+
+    Args:
+        result: 检测结果
+        crawl_stats: 网站健康记录里的爬取统计
+        budget: 一次爬多少篇
+
+    Returns:
+        float: 每秒文章数，检测没通过或者没有新闻链接时是0
+    """
+    info = result.get('info')
+    if result.get('status') != 'success' or not info:
+        return 0.0
+    news_links = (result.get('selector_hits') or {}).get('news_links', 0)
+    articles = min(budget, news_links)
+    if articles <= 0:
+        return 0.0
+
+    latency = info.get('response_time') or 0.0
+    latency += info.get('content_length', 0) / RANKING_PARSE_BYTES_PER_SECOND
+    seconds_per_article = max(latency, estimate_request_interval(latency))
+
+    success_rate = crawl_stats['success_rate'] if crawl_stats else RANKING_PRIOR_SUCCESS_RATE
+    total_time = latency + articles * seconds_per_article
+    return articles * success_rate / total_time
+
+
+def rank_sites(detection_results, crawl_stats=None, budget=MAX_NEWS_COUNT):
+    """
+    给网站排序
+
+    Args:
+        detection_results: 网站名称 -> 检测结果
+        crawl_stats: 网站名称 -> 爬取统计，没有的网站用先验成功率
+        budget: 一次爬多少篇
+
+    Returns:
+        list: [(网站名称, 每秒文章数), ...]，快的在前，一样快的保持原来的顺序
+    """
+    crawl_stats = crawl_stats or {}
+    scores = [
+        (site_name, estimate_article_rate(result, crawl_stats.get(site_name), budget))
+        for site_name, result in detection_results.items()
+    ]
+    return sorted(scores, key=lambda item: item[1], reverse=True)
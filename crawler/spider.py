@@ -1,19 +1,22 @@
 import requests
-from bs4 import BeautifulSoup
 import time
-import random
 from fake_useragent import UserAgent
 import logging
 from urllib.parse import urljoin, urlparse
 import re
 
+from .scheduler import default_scheduler
+from .retry import RetryPolicy
+from .parser import make_soup
+from .http_client import get_default_session
+
 
 class NetEaseFinanceSpider:
     """网易财经新闻爬虫类"""
     
     def __init__(self):
         self.base_url = "https://money.163.com/"
-        self.session = requests.Session()
+        self.session = get_default_session()
         self.ua = UserAgent()
         self.news_data = []
         
@@ -37,16 +40,19 @@ class NetEaseFinanceSpider:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1',
         }
-        self.session.headers.update(self.headers)
     
     def get_page(self, url, max_retries=3):
         """获取页面内容"""
+        policy = RetryPolicy(max_attempts=max_retries)
+        
+        # 按网站调度请求间隔，避免反爬
+        default_scheduler.wait(url)
+        
         for attempt in range(max_retries):
+            response = None
             try:
-                # 随机延时，避免反爬
-                time.sleep(random.uniform(1, 3))
-                
-                response = self.session.get(url, timeout=10)
+                # session是共享的，请求头每次单独传
+                response = self.session.get(url, headers=self.headers, timeout=10)
                 response.raise_for_status()
                 response.encoding = 'utf-8'
                 
@@ -55,10 +61,16 @@ class NetEaseFinanceSpider:
                 
             except requests.RequestException as e:
                 self.logger.warning(f"第{attempt + 1}次请求失败: {url}, 错误: {e}")
-                if attempt == max_retries - 1:
-                    self.logger.error(f"获取页面失败，已重试{max_retries}次: {url}")
+                if response is not None:
+                    retryable = policy.is_retryable_status(response.status_code)
+                else:
+                    retryable = policy.is_retryable_exception(e)
+                if not retryable or attempt == max_retries - 1:
+                    self.logger.error(f"获取页面失败，共请求{attempt + 1}次: {url}")
+                    return None
+                if policy.sleep(attempt, response) is None:
+                    self.logger.error(f"网站要求等待的时间太长，不再重试: {url}")
                     return None
-                time.sleep(random.uniform(2, 5))
         
         return None
     
@@ -68,7 +80,7 @@ class NetEaseFinanceSpider:
         if not html:
             return []
         
-        soup = BeautifulSoup(html, 'lxml')
+        soup = make_soup(html, parser='lxml')
         news_links = []
         
         # 查找新闻链接的各种选择器
@@ -148,7 +160,7 @@ class NetEaseFinanceSpider:
         if not html:
             return ""
         
-        soup = BeautifulSoup(html, 'lxml')
+        soup = make_soup(html, parser='lxml')
         
         # 多种内容选择器
         content_selectors = [
@@ -241,9 +253,6 @@ class NetEaseFinanceSpider:
             
             self.news_data.append(news_item)
             self.logger.info(f"成功获取新闻: {news['title'][:30]}...")
-            
-            # 随机延时
-            time.sleep(random.uniform(1, 2))
         
         self.logger.info(f"爬取完成，共获取 {len(self.news_data)} 条新闻")
         return self.news_data
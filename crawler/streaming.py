@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式解析
+Author: GCH空城
+Date: 2025-07-08
+Description: 边下载边解析文章页，调用方判断标题和摘要已经确定后就可以不读剩下的body了
+"""
+
+import codecs
+
+from bs4.dammit import EncodingDetector
+
+from .parser import FastElement
+
+try:
+    import lxml.html
+    from lxml import etree
+    STREAMING_AVAILABLE = True
+except ImportError:
+    # 流式解析靠lxml的增量解析器，没装lxml就只能整页下载
+    STREAMING_AVAILABLE = False
+
+# 攒够这么多字节再猜编码，太少的话meta里的charset可能还没读到
+ENCODING_SNIFF_BYTES = 1024
+
+
+def _detect_encoding(data):
+    """
+    猜页面编码，顺序和BeautifulSoup的UnicodeDammit一样（BOM、声明的编码、utf-8……）
+
+    只拿到了开头一段，utf-8字符可能被截断，所以用增量解码器来试
+
+    Returns:
+        tuple: (编码, 去掉BOM后的数据)
+    """
+    detector = EncodingDetector(data, is_html=True)
+    for encoding in detector.encodings:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(detector.markup)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        return encoding, detector.markup
+    return 'windows-1252', detector.markup
+
+
+class StreamingPage:
+    """
+    边下载边解析的页面
+
+    用lxml的增量解析器建树（和lxml-tree后端是同一套libxml2，树完全一样），
+    每个元素开始时就用PageExtractor看它匹配哪些关注的选择器，
+    元素结束时它的文本就不会再变了，调用方据此判断能不能提前停下。
+    """
+
+    def __init__(self, extractor):
+        """
+        初始化
+
+        Args:
+            extractor: PageExtractor，只需要包含关注的那几个选择器
+        """
+        self.extractor = extractor
+        self.bytes_read = 0
+        self._parser = etree.HTMLPullParser(events=('start', 'end'))
+        self._memo = {}
+        self._matches = {}
+        # 已经开始但还没结束的元素
+        self._open = set()
+        self._decoder = None
+        self._buffer = b''
+
+    def feed(self, chunk):
+        """
+        喂一段body进来
+
+        Args:
+            chunk: bytes
+
+        Returns:
+            bool: 这次有没有关注的元素解析完，没有的话调用方不用重新判断
+        """
+        self.bytes_read += len(chunk)
+        if self._decoder is None:
+            self._buffer += chunk
+            if len(self._buffer) < ENCODING_SNIFF_BYTES:
+                return False
+            return self._start_decoding()
+        return self._feed_text(self._decoder.decode(chunk))
+
+    def _start_decoding(self):
+        """猜出编码，把攒着的数据喂进去"""
+        encoding, data = _detect_encoding(self._buffer)
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._buffer = b''
+        return self._feed_text(self._decoder.decode(data))
+
+    def _feed_text(self, text):
+        """喂给解析器并处理新产生的事件，返回有没有关注的元素解析完"""
+        if not text:
+            return False
+        finished = False
+        self._parser.feed(text)
+        for event, element in self._parser.read_events():
+            if not isinstance(element.tag, str):
+                # 注释之类的
+                continue
+            if event == 'start':
+                for selector in self.extractor.match_element(element, self._memo):
+                    self._matches.setdefault(selector, []).append(element)
+                    self._open.add(element)
+            elif element in self._open:
+                self._open.discard(element)
+                finished = True
+        return finished
+
+    def finished(self, selector):
+        """
+        某个选择器匹配到的、已经完整解析的元素
+
+        按文档顺序返回，碰到还没结束的元素就停，保证返回的这一段以后不会再变
+
+        Returns:
+            list: FastElement列表
+        """
+        elements = []
+        for element in self._matches.get(selector, []):
+            if element in self._open:
+                break
+            elements.append(FastElement(element))
+        return elements
+
+    def close(self):
+        """
+        结束解析，没读完的部分当作文档结束
+
+        Returns:
+            FastElement: 整棵树（可能只是页面的前半段）
+        """
+        if self._decoder is None:
+            if self._buffer:
+                self._start_decoding()
+        else:
+            self._feed_text(self._decoder.decode(b'', final=True))
+        try:
+            root = self._parser.close()
+        except etree.XMLSyntaxError:
+            # 空文档之类的，给一个空树
+            root = lxml.html.document_fromstring('<html></html>')
+        return FastElement(root)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应限速
+Author: GCH空城
+Date: 2025-07-08
+Description: 根据响应延迟、状态码和重试次数自动调整每个网站的请求间隔和并发数
+"""
+
+import threading
+
+from .config import (
+    AUTOTHROTTLE_START_DELAY, AUTOTHROTTLE_MIN_DELAY, AUTOTHROTTLE_MAX_DELAY,
+    AUTOTHROTTLE_TARGET_CONCURRENCY, ASYNC_PER_HOST_CONCURRENCY
+)
+from .utils import extract_domain
+
+# 这些状态码说明对方嫌我们太快了
+THROTTLE_STATUS_CODES = {403, 429, 503}
+
+# 连续成功多少次才加一个并发
+CONCURRENCY_STEP_SUCCESSES = 5
+
+# 延迟和错误率的平滑系数
+EWMA_ALPHA = 0.3
+
+
+class AutoThrottle:
+    """
+    自适应限速器
+
+    思路和Scrapy的AutoThrottle差不多：
+    - 正常响应时，目标间隔 = 延迟 / 目标并发数，当前间隔往目标间隔靠拢
+    - 遇到403/429/503或者请求异常，间隔翻倍、并发减半
+    - 连续成功一段时间后并发慢慢加回去
+    网站扛得住就越爬越快，扛不住就自动退让。
+    """
+
+    def __init__(self, start_delay=AUTOTHROTTLE_START_DELAY,
+                 min_delay=AUTOTHROTTLE_MIN_DELAY,
+                 max_delay=AUTOTHROTTLE_MAX_DELAY,
+                 target_concurrency=AUTOTHROTTLE_TARGET_CONCURRENCY,
+                 max_concurrency=ASYNC_PER_HOST_CONCURRENCY):
+        """
+        初始化限速器
+
+        Args:
+            start_delay: 初始请求间隔（秒）
+            min_delay: 最小请求间隔（秒）
+            max_delay: 最大请求间隔（秒）
+            target_concurrency: 期望每个网站同时在途的请求数
+            max_concurrency: 每个网站并发数上限
+        """
+        self.start_delay = start_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.target_concurrency = max(target_concurrency, 0.1)
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.Lock()
+        self._sites = {}
+
+    def _get_state(self, domain):
+        """获取域名的限速状态，调用方需要持有锁"""
+        if domain not in self._sites:
+            self._sites[domain] = {
+                'delay': self.start_delay,
+                'concurrency': 1,
+                'latency': None,
+                'error_rate': 0.0,
+                'success_streak': 0,
+                'requests': 0,
+            }
+        return self._sites[domain]
+
+    def get_delay(self, domain):
+        """获取域名当前的请求间隔（秒）"""
+        with self._lock:
+            return self._get_state(domain)['delay']
+
+    def get_concurrency(self, domain):
+        """获取域名当前允许的并发数"""
+        with self._lock:
+            return self._get_state(domain)['concurrency']
+
+    def record(self, url, latency, status_code=None, retries=0):
+        """
+        记录一次请求结果并调整限速参数
+
+        Args:
+            url: 请求的URL
+            latency: 响应耗时（秒）
+            status_code: HTTP状态码，请求异常时为None
+            retries: 这次请求之前已经重试的次数
+        """
+        domain = extract_domain(url)
+        with self._lock:
+            state = self._get_state(domain)
+            state['requests'] += 1
+
+            is_error = status_code is None or status_code in THROTTLE_STATUS_CODES
+            state['error_rate'] = (
+                (1 - EWMA_ALPHA) * state['error_rate'] + EWMA_ALPHA * (1.0 if is_error else 0.0)
+            )
+
+            if is_error:
+                # 被限流或者连不上，赶紧退让
+                state['delay'] = min(self.max_delay, max(state['delay'], self.min_delay) * 2)
+                state['concurrency'] = max(1, state['concurrency'] // 2)
+                state['success_streak'] = 0
+                return
+
+            if state['latency'] is None:
+                state['latency'] = latency
+            else:
+                state['latency'] = (1 - EWMA_ALPHA) * state['latency'] + EWMA_ALPHA * latency
+
+            # 非200（比如404）不能说明网站很健康，不降低间隔
+            if status_code != 200:
+                return
+
+            target_delay = state['latency'] / self.target_concurrency
+            new_delay = (state['delay'] + target_delay) / 2.0
+            if retries:
+                # 重试过才成功的，说明不太稳，不降低间隔
+                new_delay = max(new_delay, state['delay'])
+            state['delay'] = min(self.max_delay, max(self.min_delay, new_delay))
+
+            state['success_streak'] += 1
+            if (state['success_streak'] >= CONCURRENCY_STEP_SUCCESSES
+                    and state['concurrency'] < self.max_concurrency):
+                state['concurrency'] += 1
+                state['success_streak'] = 0
+
+    def get_target_rate(self, domain):
+        """
+        获取域名当前的目标请求速率
+
+        Args:
+            domain: 域名
+
+        Returns:
+            float: 每秒请求数
+        """
+        with self._lock:
+            state = self._get_state(domain)
+            return self._rate(state)
+
+    def _rate(self, state):
+        """根据间隔和并发估算每秒请求数"""
+        if state['delay'] <= 0:
+            return float(state['concurrency'])
+        if state['latency']:
+            # 并发时每个请求还要等响应回来，速率受延迟限制
+            return min(1.0 / state['delay'], state['concurrency'] / state['latency'])
+        return 1.0 / state['delay']
+
+    def get_stats(self):
+        """
+        获取所有网站当前的限速状态，方便看爬虫跑得怎么样
+
+        Returns:
+            dict: 域名 -> 状态字典
+        """
+        with self._lock:
+            return {
+                domain: {
+                    'delay': round(state['delay'], 3),
+                    'concurrency': state['concurrency'],
+                    'latency': round(state['latency'], 3) if state['latency'] is not None else None,
+                    'error_rate': round(state['error_rate'], 3),
+                    'requests': state['requests'],
+                    'target_rate': round(self._rate(state), 3),
+                }
+                for domain, state in self._sites.items()
+            }
+
+
+# 全局共享的限速器
+default_throttle = AutoThrottle()
@@ -7,22 +7,34 @@ Date: 2025-07-08
 Description: 支持多个新闻网站的通用爬虫系统
 """
 
+import asyncio
 import requests
 import time
-import random
 import logging
-import re
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 
 from .config import (
-    NEWS_SITES, REQUEST_TIMEOUT, MAX_RETRIES, DELAY_RANGE,
-    SUMMARY_MAX_LENGTH, MIN_TITLE_LENGTH, MIN_SUMMARY_LENGTH
+    NEWS_SITES, REQUEST_TIMEOUT,
+    SUMMARY_MAX_LENGTH, MIN_TITLE_LENGTH, MIN_SUMMARY_LENGTH,
+    ASYNC_CONCURRENCY, STREAMING_EXTRACTION, STREAMING_CHUNK_SIZE, MAX_LINKS_PER_PAGE
 )
-from .utils import setup_logger, clean_text, is_valid_url
+from .utils import setup_logger, clean_text, is_valid_url, extract_domain
 from .site_detector import SiteDetector
+from .async_fetcher import AsyncFetcher
+from .scheduler import default_scheduler
+from .retry import RetryPolicy
+from .http_cache import get_default_cache
+from .http_client import get_default_session
+from .parser import make_soup
+from .extractor import PageExtractor
+from .filters import SiteFilters
+from .urlset import URLSet
+from .seen_urls import get_default_seen_store
+from .frontier import URLFrontier
+from .homepage import default_homepages
+from .streaming import StreamingPage, STREAMING_AVAILABLE
 
 
 class UniversalNewsSpider:
@@ -37,8 +49,16 @@ class UniversalNewsSpider:
         """
         self.logger = setup_logger('universal_spider')
         self.ua = UserAgent()
-        self.session = requests.Session()
+        self.session = get_default_session()
         self.site_detector = SiteDetector()
+        self.scheduler = default_scheduler
+        self.throttle = self.scheduler.throttle
+        self.retry_policy = RetryPolicy()
+        self.cache = get_default_cache()
+        self.seen = get_default_seen_store()
+        self.homepages = default_homepages
+        # 最近一次爬取的篇数，传了sink时返回的列表是空的，要看这个
+        self.last_crawl = {'attempted': 0, 'succeeded': 0}
         
         # 选择目标网站
         if site_name and site_name in NEWS_SITES:
@@ -54,6 +74,17 @@ class UniversalNewsSpider:
             
         self.base_url = self.site_config['url']
         self.selectors = self.site_config['selectors']
+        self.extractor = PageExtractor(self.selectors)
+        self.filters = SiteFilters(self.site_config.get('filters'))
+        
+        # 流式提取只需要盯着优先级最高的标题和内容选择器，
+        # 它们的结果确定了，后面的内容就不可能再改变提取结果
+        self.streaming = STREAMING_EXTRACTION and STREAMING_AVAILABLE
+        self.stream_selectors = {
+            'title': self.selectors.get('title', [])[:1],
+            'content': self.selectors.get('content', [])[:1],
+        }
+        self.stream_extractor = PageExtractor(self.stream_selectors)
         
         self.logger.info(f"✓ 选定网站: {self.site_name}")
         self.logger.info(f"✓ 网站地址: {self.base_url}")
@@ -83,69 +114,185 @@ class UniversalNewsSpider:
             'Upgrade-Insecure-Requests': '1',
         }
     
-    def get_page(self, url, retries=0):
+    def get_page(self, url, polite=True, max_age=None, stream=False):
         """
         获取页面内容
         这个函数是核心，经常会因为网络问题挂掉
         
         Args:
             url: 页面URL
-            retries: 当前重试次数
+            polite: 是否在请求前按调度器等待，异步引擎自己控制节奏时传False
+            max_age: 缓存有效期（秒），None用默认TTL，0表示必须找服务器确认
+            stream: 是否流式提取（文章页用），标题和摘要确定后就不读剩下的body
             
         Returns:
             BeautifulSoup对象或None
         """
-        if retries >= MAX_RETRIES:
-            self.logger.error(f"重试{MAX_RETRIES}次都失败了，算了: {url}")
-            return None
+        # 缓存还新鲜就不用发请求了，也不用排队等
+        cached = self.get_fresh_cached(url, max_age)
+        if cached is not None:
+            self.logger.debug(f"命中缓存: {url}")
+            return self._parse_response(url, cached)
+        
+        # 同一个网站的请求之间等一会儿，免得被当成机器人
+        # 重试不再重复等这个，由重试策略负责退避
+        if polite:
+            self.scheduler.wait(url)
+        
+        policy = self.retry_policy
+        for attempt in range(policy.max_attempts):
+            is_last = attempt == policy.max_attempts - 1
+            start_time = time.monotonic()
+            try:
+                response = self._send_request(url, stream)
+            except requests.exceptions.RequestException as e:
+                self._record_response(url, time.monotonic() - start_time, None, attempt)
+                if not policy.is_retryable_exception(e):
+                    self.logger.error(f"请求异常且无法重试: {url} - {e}")
+                    return None
+                self.logger.warning(f"请求异常: {url} - {e}")
+                if not is_last:
+                    policy.sleep(attempt)
+                continue
             
+            self._record_response(url, time.monotonic() - start_time, response.status_code, attempt)
+            
+            if response.status_code == 200:
+                return self._parse_response(url, response, stream)
+            
+            # 流式请求的body还没读，关掉把连接还回去
+            response.close()
+            
+            if not policy.is_retryable_status(response.status_code):
+                # 404这种重试也没用，直接放弃
+                self.logger.warning(f"页面状态异常，不再重试: {url} (状态码: {response.status_code})")
+                return None
+            
+            self.logger.warning(f"页面状态异常: {url} (状态码: {response.status_code})")
+            if not is_last and policy.sleep(attempt, response) is None:
+                self.logger.warning(f"网站要求等待的时间超过{policy.retry_after_max}秒，不再重试: {url}")
+                return None
+        
+        self.logger.error(f"重试{policy.max_attempts}次都失败了，算了: {url}")
+        return None
+    
+    def get_fresh_cached(self, url, max_age=None):
+        """获取缓存里还新鲜的响应，没有缓存或已过期返回None"""
+        if self.cache is None:
+            return None
+        return self.cache.get_fresh(url, max_age)
+    
+    def _send_request(self, url, stream=False):
+        """发送请求，开了缓存就走条件请求"""
+        kwargs = {
+            'headers': self.get_headers(),
+            'timeout': REQUEST_TIMEOUT,
+            'allow_redirects': True,
+        }
+        if stream:
+            # 流式请求只读一部分body，不能进缓存
+            return self.session.get(url, stream=True, **kwargs)
+        if self.cache is None:
+            return self.session.get(url, **kwargs)
+        # 新鲜的缓存在get_page开头已经查过了，这里只做条件请求
+        return self.cache.fetch(self.session, url, max_age=0, **kwargs)
+    
+    def _parse_response(self, url, response, stream=False):
+        """把200响应解析成BeautifulSoup"""
         try:
-            # 随机等一会儿，免得被当成机器人
-            delay = random.uniform(*DELAY_RANGE)
-            time.sleep(delay)
+            # 设置编码，不然中文会乱码
+            encoding = self.site_config.get('encoding', 'utf-8')
+            response.encoding = encoding
             
-            response = self.session.get(
-                url,
-                headers=self.get_headers(),
-                timeout=REQUEST_TIMEOUT,
-                allow_redirects=True
-            )
+            if stream:
+                return self._parse_streaming(url, response)
             
-            if response.status_code == 200:
-                # 设置编码，不然中文会乱码
-                encoding = self.site_config.get('encoding', 'utf-8')
-                response.encoding = encoding
-                
-                soup = BeautifulSoup(response.content, 'html.parser')
-                self.logger.debug(f"成功获取页面: {url}")
-                return soup
-            else:
-                self.logger.warning(f"页面状态异常: {url} (状态码: {response.status_code})")
-                return self.get_page(url, retries + 1)
-                
-        except requests.exceptions.RequestException as e:
-            self.logger.warning(f"请求异常: {url} - {e}")
-            return self.get_page(url, retries + 1)
+            soup = make_soup(response.content)
+            self.logger.debug(f"成功获取页面: {url}")
+            return soup
         except Exception as e:
-            self.logger.error(f"未知错误: {url} - {e}")
-            return self.get_page(url, retries + 1)
+            self.logger.error(f"页面解析失败: {url} - {e}")
+            return None
+    
+    def _parse_streaming(self, url, response):
+        """边读边解析，标题和摘要都确定了就断开，剩下的body不要了"""
+        page = StreamingPage(self.stream_extractor)
+        try:
+            for chunk in response.iter_content(STREAMING_CHUNK_SIZE):
+                # 有关注的元素解析完了才需要重新判断
+                if page.feed(chunk) and self._stream_settled(page):
+                    self.logger.debug(f"标题和摘要已确定，提前结束读取: {url} (已读 {page.bytes_read} 字节)")
+                    break
+        finally:
+            response.close()
+        return page.close()
     
-    def extract_news_links(self, soup):
+    def _stream_settled(self, page):
+        """
+        判断已经读到的部分能不能决定提取结果
+        
+        标题取第一个选择器的第一个有效元素、摘要取第一个内容选择器的前3段（最多SUMMARY_MAX_LENGTH字），
+        这两个都在已经解析完的元素里找到了，后面的内容就不会改变提取结果
+        """
+        title_selectors = self.stream_selectors['title']
+        content_selectors = self.stream_selectors['content']
+        if not title_selectors or not content_selectors:
+            return False
+        
+        if not any(self._is_title_text(clean_text(element.get_text()))
+                   for element in page.finished(title_selectors[0])):
+            return False
+        
+        paragraphs = self._collect_paragraphs(page.finished(content_selectors[0]))
+        return len(paragraphs) >= 3 or len(' '.join(paragraphs)) >= SUMMARY_MAX_LENGTH
+    
+    def _record_response(self, url, latency, status_code, retries):
+        """把请求结果告诉限速器，让它调整这个网站的请求节奏"""
+        if self.throttle is not None:
+            self.throttle.record(url, latency, status_code, retries)
+    
+    def get_throttle_stats(self):
+        """获取当前网站的限速状态（间隔、并发、目标速率等）"""
+        if self.throttle is None:
+            return None
+        return self.throttle.get_stats().get(extract_domain(self.base_url))
+    
+    def extract_news_links(self, soup, matches=None, limit=MAX_LINKS_PER_PAGE):
         """
         从首页提取新闻链接
         
         Args:
             soup: BeautifulSoup对象
+            matches: 提取器collect的结果，已经遍历过这个页面时传进来
+            limit: 最多返回多少个链接，None表示不限制
             
         Returns:
             新闻链接列表
         """
-        links = []
+        links, _ = self._collect_links(soup, self.base_url, matches)
+        return links[:limit]  # 限制链接数量
+    
+    def _collect_links(self, soup, page_url, matches=None):
+        """
+        提取页面上的新闻链接
+        
+        Args:
+            soup: BeautifulSoup对象
+            page_url: 页面URL，相对链接按它来补全
+            matches: 提取器collect的结果
+            
+        Returns:
+            tuple: (链接列表, 找到链接的选择器序号)
+        """
+        if matches is None:
+            matches = self.extractor.collect(soup)
+        
+        links = URLSet()
         link_selectors = self.selectors.get('links', [])
         
-        for selector in link_selectors:
+        for rank, selector in enumerate(link_selectors):
             try:
-                elements = soup.select(selector)
+                elements = matches.get(selector, [])
                 for element in elements:
                     href = element.get('href')
                     if href:
@@ -153,69 +300,27 @@ class UniversalNewsSpider:
                         if href.startswith('http'):
                             full_url = href
                         else:
-                            full_url = urljoin(self.base_url, href)
+                            full_url = urljoin(page_url, href)
                         
-                        # 验证链接有效性
-                        if self._is_valid_news_link(full_url) and full_url not in links:
-                            links.append(full_url)
+                        # 验证链接有效性，再按规范化后的URL去重（请求的还是原始URL）
+                        if self._is_valid_news_link(full_url):
+                            links.add(full_url)
                             
                 if links:
-                    self.logger.info(f"使用选择器 '{selector}' 找到 {len(links)} 个链接")
-                    break
+                    self.logger.debug(f"使用选择器 '{selector}' 找到 {len(links)} 个链接: {page_url}")
+                    return links.to_list(), rank
                     
             except Exception as e:
                 self.logger.warning(f"选择器 '{selector}' 解析失败: {e}")
                 continue
         
-        return links[:20]  # 限制链接数量
+        return [], len(link_selectors)
     
     def _is_valid_news_link(self, url):
         """检查链接是否为有效的新闻链接"""
         if not is_valid_url(url):
             return False
-        
-        # 排除非新闻链接
-        exclude_patterns = [
-            r'javascript:',
-            r'mailto:',
-            r'^#',
-            r'\\.(jpg|jpeg|png|gif|pdf|doc|docx|zip|rar|exe)$',
-            r'/search/',
-            r'/login',
-            r'/register',
-            r'/about',
-            r'/contact',
-            r'/privacy',
-            r'/terms',
-            r'/sitemap',
-            r'/rss',
-            r'/feed',
-            r'#comment',
-            r'#reply',
-        ]
-        
-        for pattern in exclude_patterns:
-            if re.search(pattern, url, re.IGNORECASE):
-                return False
-        
-        # 检查是否包含日期或新闻标识
-        news_indicators = [
-            r'/\d{4}/\d{2}/\d{2}/',  # 日期格式
-            r'/\d{4}-\d{2}-\d{2}/',  # 日期格式
-            r'/\d{8}/',              # 8位数字日期
-            r'\\.html$',              # html结尾
-            r'\\.shtml$',             # shtml结尾
-            r'/article/',            # 文章路径
-            r'/news/',               # 新闻路径
-            r'/finance/',            # 财经路径
-            r'/money/',              # 财经路径
-        ]
-        
-        for pattern in news_indicators:
-            if re.search(pattern, url):
-                return True
-        
-        return False
+        return self.filters.is_news_link(url)
     
     def extract_news_content(self, soup, url):
         """
@@ -229,14 +334,17 @@ class UniversalNewsSpider:
             包含标题和摘要的字典或None
         """
         try:
+            # 遍历一次页面，所有选择器的结果一起拿到
+            matches = self.extractor.collect(soup)
+            
             # 提取标题
-            title = self._extract_title(soup)
+            title = self._extract_title(soup, matches)
             if not title or len(title) < MIN_TITLE_LENGTH:
                 self.logger.debug(f"标题无效或过短: {url}")
                 return None
             
             # 提取内容摘要
-            summary = self._extract_summary(soup)
+            summary = self._extract_summary(soup, matches)
             if not summary or len(summary) < MIN_SUMMARY_LENGTH:
                 self.logger.debug(f"摘要无效或过短: {url}")
                 return None
@@ -253,19 +361,19 @@ class UniversalNewsSpider:
             self.logger.warning(f"内容提取失败: {url} - {e}")
             return None
     
-    def _extract_title(self, soup):
+    def _extract_title(self, soup, matches=None):
         """提取新闻标题"""
+        if matches is None:
+            matches = self.extractor.collect(soup)
         title_selectors = self.selectors.get('title', [])
         
         for selector in title_selectors:
             try:
-                elements = soup.select(selector)
+                elements = matches.get(selector, [])
                 for element in elements:
                     text = clean_text(element.get_text())
-                    if text and len(text) >= MIN_TITLE_LENGTH:
-                        # 过滤掉无效的标题
-                        if self._is_valid_title(text):
-                            return text
+                    if self._is_title_text(text):
+                        return text
             except Exception:
                 continue
         
@@ -283,50 +391,28 @@ class UniversalNewsSpider:
             
         return None
     
+    def _is_title_text(self, text):
+        """标题选择器取到的文本能不能当标题"""
+        # 过滤掉无效的标题
+        return bool(text) and len(text) >= MIN_TITLE_LENGTH and self._is_valid_title(text)
+    
     def _is_valid_title(self, title):
         """检查标题是否有效"""
         if not title or len(title) < MIN_TITLE_LENGTH:
             return False
-        
-        # 过滤无效的标题模式
-        invalid_patterns = [
-            r'更多$',  # 以"更多"结尾
-            r'^更多',  # 以"更多"开头
-            r'^\s*$',  # 只有空白字符
-            r'广告',   # 包含"广告"
-            r'版权',   # 包含"版权"
-            r'免责',   # 包含"免责"
-            r'登录',   # 包含"登录"
-            r'注册',   # 包含"注册"
-            r'客服',   # 包含"客服"
-            r'联系我们', # 包含"联系我们"
-            r'关于我们', # 包含"关于我们"
-            r'^[\\d\\s\\-\\|]+$',  # 只包含数字、空格、横线、竖线
-        ]
-        
-        for pattern in invalid_patterns:
-            if re.search(pattern, title):
-                return False
-        
-        return True
-    
-    def _extract_summary(self, soup):
+        return self.filters.is_valid_title(title)
+    
+    def _extract_summary(self, soup, matches=None):
         """提取新闻摘要"""
+        if matches is None:
+            matches = self.extractor.collect(soup)
         content_selectors = self.selectors.get('content', [])
         
         for selector in content_selectors:
             try:
-                elements = soup.select(selector)
+                elements = matches.get(selector, [])
                 if elements:
-                    # 合并所有段落文本
-                    paragraphs = []
-                    for element in elements:
-                        text = clean_text(element.get_text())
-                        if text and len(text) > 10:  # 过滤掉过短的文本
-                            # 进一步过滤无效内容
-                            if self._is_valid_paragraph(text):
-                                paragraphs.append(text)
-                    
+                    paragraphs = self._collect_paragraphs(elements)
                     if paragraphs:
                         # 取前几个段落作为摘要
                         summary = ' '.join(paragraphs[:3])
@@ -337,86 +423,265 @@ class UniversalNewsSpider:
         
         return "暂无摘要"
     
+    def _collect_paragraphs(self, elements):
+        """合并段落文本，摘要只用前3段，凑够了就不用再处理后面的"""
+        paragraphs = []
+        for element in elements:
+            text = clean_text(element.get_text())
+            if text and len(text) > 10:  # 过滤掉过短的文本
+                # 进一步过滤无效内容
+                if self._is_valid_paragraph(text):
+                    paragraphs.append(text)
+                    if len(paragraphs) >= 3:
+                        break
+        return paragraphs
+    
     def _is_valid_paragraph(self, text):
         """检查段落是否有效"""
         if not text or len(text) < 10:
             return False
-        
-        # 过滤无效的段落模式
-        invalid_patterns = [
-            r'广告',
-            r'免责声明',
-            r'版权所有',
-            r'联系我们',
-            r'关于我们',
-            r'客服电话',
-            r'投诉建议',
-            r'意见反馈',
-            r'^\\d+$',  # 只有数字
-            r'^[\\s\\-\\|]+$',  # 只有空白和分隔符
-            r'分享到',
-            r'收藏',
-            r'点赞',
-            r'评论',
-            r'转发',
-            r'举报',
-        ]
-        
-        for pattern in invalid_patterns:
-            if re.search(pattern, text):
-                return False
-        
-        return True
-    
-    def crawl_news(self, max_count=20):
+        return self.filters.is_valid_paragraph(text)
+    
+    def crawl_news(self, max_count=20, sink=None):
         """
         爬取新闻
         
+        从首页（和配置里的start_urls）出发，按待爬队列的优先级一篇篇爬，
+        MAX_CRAWL_DEPTH大于1时文章页、栏目页上的链接也会继续往下爬
+        
         Args:
-            max_count: 最大爬取数量
+            max_count: 最多爬多少篇文章（入口页不算）
+            sink: 边爬边写的输出（比如DataManager.open_sink()），每提取成功一篇就写进去，
+                写进去的文章同时记成爬过，内存里不再攒着
             
         Returns:
-            新闻数据列表
+            新闻数据列表，传了sink时为空（篇数看last_crawl）；
+            没传sink的话保存好之后要调用mark_saved，下次才会跳过这些文章
+        """
+        progress = {'attempted': 0}
+        news_data = []
+        succeeded = 0
+        for news_info in self._crawl_articles(max_count, progress):
+            succeeded += 1
+            if sink is not None:
+                self._write_to_sink(sink, news_info)
+            else:
+                news_data.append(news_info)
+        return self._finish_crawl(news_data, succeeded, progress['attempted'])
+    
+    def iter_news(self, max_count=20):
         """
+        边爬边产出新闻的生成器，内存里不攒新闻，适合大量爬取
+        
+        调用方处理完一条（比如写进文件）拿下一条时，这条才记成爬过，
+        中途崩了的话没处理的那条下次还会再爬
+        
+        Args:
+            max_count: 最多爬多少篇文章（入口页不算）
+            
+        Yields:
+            dict: 新闻数据
+        """
+        progress = {'attempted': 0}
+        succeeded = 0
+        for news_info in self._crawl_articles(max_count, progress):
+            yield news_info
+            self._mark_seen([news_info])
+            succeeded += 1
+        self._finish_crawl([], succeeded, progress['attempted'])
+    
+    def _crawl_articles(self, max_count, progress):
+        """同步引擎的主循环，每提取成功一篇就产出一篇，尝试的篇数记在progress里"""
         self.logger.info(f"开始爬取 {self.site_name} 新闻...")
+        frontier = self._create_frontier()
+        
+        attempted = 0
+        while frontier and attempted < max_count:
+            entry = frontier.pop()
+            
+            # 入口页只用来找链接，每次都要找服务器确认有没有更新（检测时刚下载过的除外）
+            if entry.depth == 0:
+                soup = self._get_shared_homepage(entry.url) or self.get_page(entry.url, max_age=0)
+                self._expand_links(frontier, entry, soup)
+                continue
+            
+            attempted += 1
+            progress['attempted'] = attempted
+            self.logger.info(f"正在处理第 {attempted}/{max_count} 个新闻 (深度 {entry.depth})...")
+            
+            news_soup = self.get_page(entry.url, stream=self._can_stream(frontier, entry))
+            news_info = self._process_article(entry.url, news_soup)
+            self._expand_links(frontier, entry, news_soup)
+            if news_info:
+                yield news_info
+    
+    def _get_shared_homepage(self, url):
+        """网站检测时刚下载过这个页面的话直接用，返回soup或None"""
+        snapshot = self.homepages.get(url)
+        if snapshot is None:
+            return None
+        self.logger.info(f"使用检测时下载的首页 ({snapshot.age():.0f}秒前): {url}")
+        return snapshot.soup
+    
+    async def _fetch_entry_page(self, fetcher, url):
+        """异步引擎获取入口页，和crawl_news一样先看检测时有没有下载过"""
+        soup = self._get_shared_homepage(url)
+        if soup is not None:
+            return soup
+        return await fetcher.fetch(url, max_age=0)
+    
+    def _create_frontier(self):
+        """创建待爬队列，首页和配置里的start_urls（栏目页、翻页）是入口"""
+        frontier = URLFrontier()
+        for url in [self.base_url] + self.site_config.get('start_urls', []):
+            frontier.add(url, 0)
+        return frontier
+    
+    def _can_stream(self, frontier, entry):
+        """页面上的链接还要继续爬的话得读完整页，不能流式提前断开"""
+        return self.streaming and not frontier.can_expand(entry.depth)
+    
+    def _expand_links(self, frontier, entry, soup):
+        """把页面上的新闻链接加到待爬队列"""
+        if entry.depth == 0 and not soup:
+            self.logger.error(f"无法获取入口页内容: {entry.url}")
+            return
+        if not soup or not frontier.can_expand(entry.depth):
+            return
         
-        # 获取首页
-        soup = self.get_page(self.base_url)
-        if not soup:
-            self.logger.error("无法获取首页内容")
+        links, rank = self._collect_links(soup, entry.url)
+        # 先去掉爬过的再截断，不然首页前面几十条都爬过时新文章一条也进不了队列
+        links = self._skip_seen(links)[:MAX_LINKS_PER_PAGE]
+        added = frontier.add_many(links, entry.depth + 1, rank)
+        if entry.depth == 0:
+            self.logger.info(f"入口页找到 {len(links)} 个新链接: {entry.url}")
+        else:
+            self.logger.debug(f"加入 {added} 个新链接 (深度 {entry.depth + 1}): {entry.url}")
+    
+    def _finish_crawl(self, news_data, succeeded, attempted):
+        """爬完后的收尾，同步和异步引擎共用"""
+        self.last_crawl = {'attempted': attempted, 'succeeded': succeeded}
+        if attempted == 0:
+            self.logger.warning("没有可爬的文章：入口页没找到新闻链接，或者都爬过了")
             return []
+        self._report_crawl(succeeded, attempted)
+        return news_data
+    
+    def _report_crawl(self, succeeded, attempted):
+        """输出爬取结果，记下成功率（下次推荐网站时用）"""
+        self.logger.info(f"爬取完成: 成功 {succeeded}/{attempted} 条新闻")
+        if self.site_detector.registry is not None:
+            self.site_detector.registry.record_crawl(self.site_name, attempted, succeeded)
+        self._log_throttle_stats()
+    
+    def _process_article(self, link, news_soup):
+        """处理单篇新闻页面，同步和异步引擎共用"""
+        if not news_soup:
+            self.logger.warning(f"✗ 页面获取失败: {link}")
+            return None
         
-        # 提取新闻链接
-        self.logger.info("正在提取新闻链接...")
-        news_links = self.extract_news_links(soup)
+        news_info = self.extract_news_content(news_soup, link)
+        if news_info:
+            self.logger.info(f"✓ 成功: {news_info['title'][:50]}...")
+        else:
+            self.logger.warning(f"✗ 内容提取失败: {link}")
+        return news_info
+    
+    async def crawl_news_async(self, max_count=20, concurrency=ASYNC_CONCURRENCY, sink=None):
+        """
+        异步并发爬取新闻，提取结果和crawl_news一致
         
-        if not news_links:
-            self.logger.error("未找到任何新闻链接")
-            return []
+        一批批从待爬队列里取URL并发抓取，每个页面抓完马上提取、写sink、把新链接加进队列，
+        不用等同一批里最慢的那个
         
-        self.logger.info(f"找到 {len(news_links)} 个新闻链接")
+        Args:
+            max_count: 最多爬多少篇文章（入口页不算）
+            concurrency: 总并发数
+            sink: 边爬边写的输出，每提取成功一篇就写进去，写进去的文章同时记成爬过，内存里不再攒着
+            
+        Returns:
+            新闻数据列表，传了sink时为空（篇数看last_crawl）；没传sink的话保存好之后要调用mark_saved
+        """
+        self.logger.info(f"开始并发爬取 {self.site_name} 新闻 (并发数: {concurrency})...")
+        fetcher = AsyncFetcher(self, concurrency=concurrency)
+        frontier = self._create_frontier()
         
-        # 爬取新闻内容
         news_data = []
-        success_count = 0
-        
-        for i, link in enumerate(news_links[:max_count], 1):
-            self.logger.info(f"正在处理第 {i}/{min(len(news_links), max_count)} 个新闻...")
+        progress = {'succeeded': 0}
+        attempted = 0
+        while frontier and attempted < max_count:
+            # 这一批取到剩下的名额为止，并发由fetcher控制
+            batch = []
+            budget = max_count - attempted
+            while frontier and budget > 0:
+                entry = frontier.pop()
+                batch.append(entry)
+                if entry.depth > 0:
+                    budget -= 1
             
-            news_soup = self.get_page(link)
-            if news_soup:
-                news_info = self.extract_news_content(news_soup, link)
-                if news_info:
-                    news_data.append(news_info)
-                    success_count += 1
-                    self.logger.info(f"✓ 成功: {news_info['title'][:50]}...")
+            attempted += sum(1 for entry in batch if entry.depth > 0)
+            await asyncio.gather(*[
+                self._crawl_entry_async(fetcher, frontier, entry, sink, news_data, progress)
+                for entry in batch
+            ])
+        
+        return self._finish_crawl(news_data, progress['succeeded'], attempted)
+    
+    async def _crawl_entry_async(self, fetcher, frontier, entry, sink, news_data, progress):
+        """异步引擎处理一个页面：抓取、提取、写sink、加新链接，成功的篇数记在progress里"""
+        if entry.depth == 0:
+            soup = await self._fetch_entry_page(fetcher, entry.url)
+        else:
+            soup = await fetcher.fetch(entry.url, stream=self._can_stream(frontier, entry))
+            news_info = self._process_article(entry.url, soup)
+            if news_info:
+                progress['succeeded'] += 1
+                if sink is not None:
+                    self._write_to_sink(sink, news_info)
                 else:
-                    self.logger.warning(f"✗ 内容提取失败: {link}")
-            else:
-                self.logger.warning(f"✗ 页面获取失败: {link}")
+                    news_data.append(news_info)
+        self._expand_links(frontier, entry, soup)
+    
+    def _skip_seen(self, links):
+        """去掉以前已经爬成功的文章链接"""
+        if self.seen is None:
+            return links
+        new_links = self.seen.filter_new(links)
+        skipped = len(links) - len(new_links)
+        if skipped:
+            self.logger.info(f"跳过 {skipped} 个以前爬过的链接")
+        return new_links
+    
+    def _write_to_sink(self, sink, news_info):
+        """写进sink，写成功了才记成爬过"""
+        sink.write(news_info)
+        self._mark_seen([news_info])
+    
+    def _mark_seen(self, news_data):
+        """把这次爬成功的文章记下来，失败的下次还会再试"""
+        if self.seen is not None and news_data:
+            self.seen.add_many([news['url'] for news in news_data], self.site_name)
+    
+    def mark_saved(self, news_data):
+        """
+        crawl_news返回的新闻保存好之后调用，记成爬过，下次跳过
         
-        self.logger.info(f"爬取完成: 成功 {success_count}/{len(news_links[:max_count])} 条新闻")
-        return news_data
+        在保存之前记的话，保存失败这些文章就再也爬不到了；传了sink的不用调
+        """
+        self._mark_seen(news_data)
+    
+    def _log_throttle_stats(self):
+        """输出当前网站的限速状态"""
+        stats = self.get_throttle_stats()
+        if stats:
+            self.logger.info(
+                f"限速状态: 间隔 {stats['delay']}s, 并发 {stats['concurrency']}, "
+                f"目标速率 {stats['target_rate']} 请求/秒"
+            )
+    
+    def crawl_news_concurrent(self, max_count=20, concurrency=ASYNC_CONCURRENCY, sink=None):
+        """crawl_news_async的同步入口，给main这种同步代码用"""
+        return asyncio.run(self.crawl_news_async(max_count, concurrency, sink))
     
     def get_site_info(self):
         """获取当前使用的网站信息"""
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+URL集合
+Author: GCH空城
+Date: 2025-07-08
+Description: 按规范化后的URL去重，保持加入顺序，查重是O(1)，拿出来的还是原来的URL
+"""
+
+from .utils import canonicalize_url, normalize_url
+
+
+class URLSet:
+    """
+    有序URL集合
+
+    加进来的URL先用canonicalize_url规范化，锚点、跟踪参数、
+    参数顺序、域名大小写不同的链接只保留第一次出现的那个。
+    规范化的结果只用来查重，存的和拿出来的都是第一次出现时的原始URL（相对链接补全），
+    真正请求的还是页面上的那个地址，参数不会被改掉。
+    """
+
+    def __init__(self, urls=None, base_url=None):
+        """
+        初始化集合
+
+        Args:
+            urls: 初始URL列表
+            base_url: 基础URL，处理相对链接用
+        """
+        self.base_url = base_url
+        # 规范化URL -> 原始URL，dict本身就保持插入顺序
+        self._urls = {}
+        for url in urls or []:
+            self.add(url)
+
+    def add(self, url):
+        """
+        加一个URL
+
+        Returns:
+            bool: 是不是新的URL（无效或重复的返回False）
+        """
+        url = normalize_url(url, self.base_url)
+        canonical = canonicalize_url(url)
+        if canonical is None or canonical in self._urls:
+            return False
+        self._urls[canonical] = url
+        return True
+
+    def __contains__(self, url):
+        canonical = canonicalize_url(url, self.base_url)
+        return canonical is not None and canonical in self._urls
+
+    def __len__(self):
+        return len(self._urls)
+
+    def __iter__(self):
+        return iter(self._urls.values())
+
+    def to_list(self):
+        """按加入顺序返回原始URL列表"""
+        return list(self._urls.values())
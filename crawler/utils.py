@@ -12,9 +12,11 @@ import logging
 import os
 import time
 import random
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, unquote_plus
 from datetime import datetime
 
+from .config import TRACKING_PARAMS
+
 
 def setup_logger(name, level=logging.INFO):
     """
@@ -63,6 +65,18 @@ def setup_logger(name, level=logging.INFO):
     return logger
 
 
+# clean_text用的正则，模块加载时编译一次
+_TAG_RE = re.compile(r'<[^>]+>')
+# 数字时间戳（如：20250707 151012）、单独的年份、时间，一次扫完
+_NUMBER_RE = re.compile(r'\b\d{8}\s+\d{6}\b|\b\d{4}\b|\b\d{1,2}:\d{2}\b')
+# 特殊字符，保留中文标点；注意""''这里是两个字符串拼起来的，所以单引号并不在保留范围里
+_SPECIAL_CHAR_CLASS = r'[^\w\s\u4e00-\u9fff，。、；：""''！？（）【】《》-]'
+_SPECIAL_CHAR_RE = re.compile(_SPECIAL_CHAR_CLASS)
+_SEPARATOR_RE = re.compile(r'[-|]{2,}')
+# 文本里没有这些东西就不用清理了，大部分标题都走这条路
+_NEEDS_CLEANING_RE = re.compile(r'[<\d]|\s\s|[^\S ]|^\s|\s$|--|' + _SPECIAL_CHAR_CLASS)
+
+
 def clean_text(text):
     """
     清理文本内容
@@ -76,33 +90,26 @@ def clean_text(text):
     if not text:
         return ""
     
-    # 移除HTML标签
-    text = re.sub(r'<[^>]+>', '', text)
-    
-    # 移除JavaScript代码
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
-    
-    # 移除CSS样式
-    text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
-    
-    # 移除多余的空白字符
-    text = re.sub(r'\s+', ' ', text)
+    # 已经很干净的文本直接返回
+    if not _NEEDS_CLEANING_RE.search(text):
+        return text
     
-    # 移除数字时间戳（如：20250707 151012）
-    text = re.sub(r'\b\d{8}\s+\d{6}\b', '', text)
+    # 移除HTML标签，script/style的标签这一步也一起去掉了，里面的内容get_text时就跳过了
+    if '<' in text:
+        text = _TAG_RE.sub('', text)
     
-    # 移除单独的数字和时间
-    text = re.sub(r'\b\d{4}\b', '', text)  # 年份
-    text = re.sub(r'\b\d{1,2}:\d{2}\b', '', text)  # 时间
+    # 移除多余的空白字符，顺便去掉首尾空白
+    text = ' '.join(text.split())
     
-    # 移除首尾空白
-    text = text.strip()
+    # 移除数字时间戳、单独的数字和时间
+    text = _NUMBER_RE.sub('', text).strip()
     
     # 清理特殊字符但保留中文标点
-    text = re.sub(r'[^\w\s\u4e00-\u9fff，。、；：""''！？（）【】《》-]', '', text)
+    text = _SPECIAL_CHAR_RE.sub('', text)
     
     # 移除多余的分隔符
-    text = re.sub(r'[-|]{2,}', '', text)
+    if '-' in text:
+        text = _SEPARATOR_RE.sub('', text)
     
     return text
 
@@ -147,6 +154,45 @@ def normalize_url(url, base_url):
     return url if is_valid_url(url) else None
 
 
+def canonicalize_url(url, base_url=None, tracking_params=TRACKING_PARAMS):
+    """
+    规范化URL，同一篇文章的不同写法得到同一个结果，用来去重
+    
+    在normalize_url的基础上：scheme和域名转小写，去掉#锚点，
+    去掉跟踪参数，剩下的查询参数排序（参数本身的编码保持不变）
+    
+    Args:
+        url: 原始URL
+        base_url: 基础URL，处理相对链接用
+        tracking_params: 要去掉的查询参数名（不区分大小写）
+        
+    Returns:
+        str: 规范化后的URL，无效URL返回None
+    """
+    url = normalize_url(url, base_url)
+    if not url:
+        return None
+    
+    parts = urlsplit(url)
+    tracking = {name.lower() for name in tracking_params}
+    query = []
+    for pair in parts.query.split('&'):
+        if not pair:
+            continue
+        name = unquote_plus(pair.split('=', 1)[0]).lower()
+        if name not in tracking:
+            query.append(pair)
+    query.sort()
+    
+    return urlunsplit((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or '/',
+        '&'.join(query),
+        ''
+    ))
+
+
 def random_delay(min_seconds=1, max_seconds=3):
     """
     随机延时
@@ -159,6 +205,12 @@ def random_delay(min_seconds=1, max_seconds=3):
     time.sleep(delay)
 
 
+# URL里的日期：/2025/07/08/、/2025-07-08/、/2025/0708/
+_URL_DATE_RE = re.compile(
+    r'/(\d{4})/(\d{2})/(\d{2})/|/(\d{4})-(\d{2})-(\d{2})/|/(\d{4})/(\d{2})(\d{2})/'
+)
+
+
 def extract_date_from_url(url):
     """
     从URL中提取日期
@@ -169,14 +221,30 @@ def extract_date_from_url(url):
     Returns:
         str: 日期字符串或None
     """
-    date_pattern = r'/(\d{4})/(\d{2})/(\d{2})/'
-    match = re.search(date_pattern, url)
+    match = _URL_DATE_RE.search(url)
     if match:
-        year, month, day = match.groups()
+        year, month, day = [group for group in match.groups() if group is not None]
         return f"{year}-{month}-{day}"
     return None
 
 
+# is_news_url用的规则，模块加载时编译一次
+_NEWS_URL_RE = re.compile(
+    r'/\d{4}/\d{2}/\d{2}/'  # 日期格式
+    r'|\.html$'  # html结尾
+    r'|/article/'  # 文章路径
+    r'|/news/'  # 新闻路径
+)
+_NON_NEWS_URL_RE = re.compile(
+    r'javascript:|mailto:|^#|\.(jpg|png|gif|pdf|doc|zip|rar)$',
+    re.IGNORECASE
+)
+_DEFAULT_NEWS_KEYWORDS = (
+    'news', 'article', 'finance', 'money',
+    '新闻', '财经', '金融', '经济'
+)
+
+
 def is_news_url(url, keywords=None):
     """
     判断URL是否为新闻链接
@@ -191,40 +259,22 @@ def is_news_url(url, keywords=None):
     if not url:
         return False
     
-    if keywords is None:
-        keywords = [
-            'news', 'article', 'finance', 'money', 
-            '新闻', '财经', '金融', '经济'
-        ]
-    
     # 新闻URL特征
-    news_patterns = [
-        r'/\d{4}/\d{2}/\d{2}/',  # 日期格式
-        r'\.html$',  # html结尾
-        r'/article/',  # 文章路径
-        r'/news/',   # 新闻路径
-    ]
-    
-    for pattern in news_patterns:
-        if re.search(pattern, url):
-            return True
+    if _NEWS_URL_RE.search(url):
+        return True
     
     # 检查关键词
     url_lower = url.lower()
-    if any(keyword.lower() in url_lower for keyword in keywords):
+    if keywords is None:
+        keywords = _DEFAULT_NEWS_KEYWORDS
+    else:
+        keywords = [keyword.lower() for keyword in keywords]
+    if any(keyword in url_lower for keyword in keywords):
         return True
     
     # 排除非新闻链接
-    exclude_patterns = [
-        r'javascript:',
-        r'mailto:',
-        r'^#',
-        r'\\.(jpg|png|gif|pdf|doc|zip|rar)$'
-    ]
-    
-    for pattern in exclude_patterns:
-        if re.search(pattern, url, re.IGNORECASE):
-            return False
+    if _NON_NEWS_URL_RE.search(url):
+        return False
     
     return True
 